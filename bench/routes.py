@@ -0,0 +1,347 @@
+"""Нагрузочный прогон всех роутов items и users в процессе, через ASGI-транспорт.
+
+Строит синтетическую базу заданного размера, гоняет каждый роут с заданной конкурентностью
+и сохраняет throughput и p50/p95/p99 по роутам в JSON. С --baseline сравнивает результат
+с прошлым прогоном и завершается с кодом 1, если какой-то роут вышел за пороги.
+
+Запуск: python -m bench.routes --items 1000000 --users 100000 --output bench.json
+        python -m bench.routes --baseline bench.json --output bench-new.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Callable
+from itertools import batched
+from pathlib import Path
+from typing import Any
+
+from sqlmodel import SQLModel
+
+# сколько записей уходит в один bulk-запрос
+BULK_SIZE = 10
+SEED_BATCH_SIZE = 10_000
+CART_ITEM_ID = 1
+
+
+class Dataset:
+    """Синтетическая база: обычные id выбираются случайно, расходуемые (удаление, покупка корзины) — по одному разу."""
+
+    def __init__(self, items: int, users: int, requests: int):
+        self.items = items
+        self.users = users
+        # расходуемые роуты есть и в bulk-, и в одиночном варианте
+        consumed = requests * (BULK_SIZE + 1)
+        # пользователи 1..users — обычные, дальше — пулы под роуты, которые меняют или удаляют данные
+        self.pools: dict[str, range] = {}
+        start = users + 1
+        for pool in ("cart_read", "cart_buy", "cart_delete", "cart_edit", "cart_create", "user_delete"):
+            self.pools[pool] = range(start, start + consumed)
+            start += consumed
+        self.total_users = start - 1
+        self.pools["item_delete"] = range(items + 1, items + 1 + consumed)
+        self.total_items = items + consumed
+        self._taken: Counter[str] = Counter()
+        self.rng = random.Random(42)  # noqa: S311
+
+    def item_id(self) -> int:
+        return self.rng.randint(1, self.items)
+
+    def user_id(self) -> int:
+        return self.rng.randint(1, self.users)
+
+    def pick(self, pool: str) -> int:
+        return self.rng.choice(self.pools[pool])
+
+    def take(self, pool: str, count: int = 1) -> list[int]:
+        start = self._taken[pool]
+        self._taken[pool] += count
+        return list(self.pools[pool][start : start + count])
+
+    def cart_users(self) -> range:
+        return range(self.pools["cart_read"].start, self.pools["cart_edit"].stop)
+
+
+def item_payload(rng: random.Random) -> dict[str, Any]:
+    return {
+        "name": f"bench item {rng.getrandbits(48):x}",
+        "description": "synthetic",
+        "price": rng.randint(1, 1000),
+        "quantity_in_stock": 1_000_000,
+        "adult_product": False,
+    }
+
+
+def user_payload(rng: random.Random) -> dict[str, Any]:
+    suffix = f"{rng.getrandbits(48):x}"
+    return {
+        "first_name": "Bench",
+        "last_name": suffix,
+        "email": f"bench{suffix}@example.com",
+        "age": 30,
+        "password": "benchpass",
+        "sex": "Male",
+        "balance": 1_000_000_000,
+    }
+
+
+# (метод, путь роута) -> функция, которая строит аргументы очередного запроса
+Scenario = Callable[[Dataset], dict[str, Any]]
+
+SCENARIOS: dict[tuple[str, str], Scenario] = {
+    ("POST", "/items/bulk"): lambda d: {"json": [item_payload(d.rng) for _ in range(BULK_SIZE)]},
+    ("PATCH", "/items/bulk"): lambda d: {"json": [{"id": d.item_id(), "price": 100} for _ in range(BULK_SIZE)]},
+    ("DELETE", "/items/bulk"): lambda d: {"json": d.take("item_delete", BULK_SIZE)},
+    ("GET", "/items/export"): lambda _: {},
+    ("GET", "/users/export"): lambda _: {"params": {"format": "csv", "gzip": True}},
+    ("GET", "/items/search"): lambda d: {"params": {"q": "bench item", "max_price": d.rng.randint(100, 1000)}},
+    ("GET", "/items/{item_id}"): lambda d: {"url": f"/items/{d.item_id()}"},
+    ("POST", "/items/{item_id}"): lambda d: {"url": "/items/0", "json": item_payload(d.rng)},
+    ("GET", "/items/"): lambda d: {"params": {"after": d.item_id()}},
+    ("DELETE", "/items/{item_id}"): lambda d: {"url": f"/items/{d.take('item_delete')[0]}"},
+    ("PATCH", "/items/{item_id}"): lambda d: {"url": f"/items/{d.item_id()}", "json": {"price": 100}},
+    ("GET", "/items/get_by_owner/{owner_id}"): lambda d: {"url": f"/items/get_by_owner/{d.user_id()}"},
+    ("POST", "/items/calculate-total/"): lambda d: {"json": [d.item_id() for _ in range(BULK_SIZE)]},
+    ("GET", "/items/stats/inventory-value"): lambda d: {"params": {"after": d.user_id()}},
+    ("GET", "/items/stats/price-percentiles"): lambda _: {},
+    ("GET", "/items/stats/stock"): lambda _: {},
+    ("POST", "/users/bulk"): lambda d: {"json": [user_payload(d.rng) for _ in range(BULK_SIZE)]},
+    ("PATCH", "/users/bulk"): lambda d: {"json": [{"id": d.user_id(), "age": 31} for _ in range(BULK_SIZE)]},
+    ("DELETE", "/users/bulk"): lambda d: {"json": d.take("user_delete", BULK_SIZE)},
+    ("POST", "/users/carts/checkout"): lambda d: {"json": d.take("cart_buy", BULK_SIZE)},
+    ("GET", "/users/with_items"): lambda d: {"params": {"ids": [d.user_id() for _ in range(BULK_SIZE)]}},
+    ("GET", "/users/{user_id}"): lambda d: {"url": f"/users/{d.user_id()}"},
+    ("POST", "/users/"): lambda d: {"json": user_payload(d.rng)},
+    ("PATCH", "/users/{user_id}"): lambda d: {"url": f"/users/{d.user_id()}", "json": {"age": 31}},
+    ("GET", "/users/"): lambda d: {"params": {"after": d.user_id()}},
+    ("DELETE", "/users/{user_id}"): lambda d: {"url": f"/users/{d.take('user_delete')[0]}"},
+    ("GET", "/users/with_items/{user_id}"): lambda d: {"url": f"/users/with_items/{d.user_id()}"},
+    ("POST", "/users/{user_id}/cart"): lambda d: cart_create(d),
+    ("GET", "/users/{user_id}/cart"): lambda d: {"url": f"/users/{d.pick('cart_read')}/cart"},
+    ("DELETE", "/users/{user_id}/cart"): lambda d: {"url": f"/users/{d.take('cart_delete')[0]}/cart"},
+    ("POST", "/users/{user_id}/cart/items/{item_id}"): lambda d: {
+        "url": f"/users/{d.pick('cart_read')}/cart/items/{d.item_id()}",
+    },
+    # товар CART_ITEM_ID сид кладёт в каждую корзину
+    ("DELETE", "/users/{user_id}/cart/items/{item_id}"): lambda d: {
+        "url": f"/users/{d.take('cart_edit')[0]}/cart/items/{CART_ITEM_ID}",
+    },
+    ("POST", "/users/{user_id}/items"): lambda d: {
+        "url": f"/users/{d.user_id()}/items",
+        "params": {"item_id": d.item_id()},
+    },
+    ("POST", "/users/{user_id}/cart/buy"): lambda d: {"url": f"/users/{d.take('cart_buy')[0]}/cart/buy"},
+}
+
+
+def cart_create(dataset: Dataset) -> dict[str, Any]:
+    user_id = dataset.take("cart_create")[0]
+    item_ids = [dataset.item_id() for _ in range(3)]
+    return {"url": f"/users/{user_id}/cart", "json": {"user_id": user_id, "item_ids": item_ids}}
+
+
+class RouteStats(SQLModel):
+    requests: int
+    errors: int
+    statuses: dict[str, int]
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def seed(dataset: Dataset):
+    from sqlalchemy import insert  # noqa: PLC0415
+
+    from core.database import create_db_and_tables, engine  # noqa: PLC0415
+    from items.model import Item  # noqa: PLC0415
+    from users.model import CartItem, User, UserCartRead  # noqa: PLC0415
+
+    create_db_and_tables()
+    rng = dataset.rng
+    items = (
+        {
+            "name": f"item {n}",
+            "description": "synthetic item",
+            "price": rng.randint(1, 1000),
+            "quantity_in_stock": 1_000_000,
+            "adult_product": n % 10 == 0,
+            "owner_id": rng.randint(1, dataset.users),
+        }
+        for n in range(1, dataset.total_items + 1)
+    )
+    users = (
+        {
+            "first_name": "User",
+            "last_name": str(n),
+            "email": f"user{n}@example.com",
+            "age": 18 + n % 50,
+            "password": "password",
+            "sex": "Male",
+            "balance": 1_000_000_000,
+        }
+        for n in range(1, dataset.total_users + 1)
+    )
+    cart_ids = range(1, len(dataset.cart_users()) + 1)
+    carts = (
+        {"id": cart_id, "user_id": user_id} for cart_id, user_id in zip(cart_ids, dataset.cart_users(), strict=True)
+    )
+    cart_items = (
+        {"cart_id": cart_id, "item_id": item_id, "qty": 1}
+        for cart_id in cart_ids
+        for item_id in (CART_ITEM_ID, *rng.sample(range(CART_ITEM_ID + 1, dataset.items + 1), 2))
+    )
+
+    with engine.begin() as conn:
+        for model, rows in ((Item, items), (User, users), (UserCartRead, carts), (CartItem, cart_items)):
+            for batch in batched(rows, SEED_BATCH_SIZE, strict=False):
+                conn.execute(insert(model), batch)
+
+
+def percentile(quantiles: list[float], p: int) -> float:
+    return round(quantiles[p - 1] * 1000, 3)
+
+
+async def drive(client, dataset: Dataset, route: tuple[str, str], requests: int, concurrency: int) -> RouteStats:
+    method, path = route
+    scenario = SCENARIOS[route]
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            kwargs = scenario(dataset)
+            url = kwargs.pop("url", path)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return RouteStats(
+        requests=requests,
+        errors=sum(count for code, count in statuses.items() if code >= 400),  # noqa: PLR2004
+        statuses={str(code): count for code, count in sorted(statuses.items())},
+        throughput=round(requests / elapsed, 1),
+        p50_ms=percentile(quantiles, 50),
+        p95_ms=percentile(quantiles, 95),
+        p99_ms=percentile(quantiles, 99),
+    )
+
+
+async def run(dataset: Dataset, requests: int, concurrency: int) -> dict[str, RouteStats]:
+    import httpx  # noqa: PLC0415
+
+    from core.config import settings  # noqa: PLC0415
+    from core.database import async_engine  # noqa: PLC0415
+    from items.router import router as items_router  # noqa: PLC0415
+    from main import app  # noqa: PLC0415
+    from users.purchase_queue import purchase_queue  # noqa: PLC0415
+    from users.router import router as users_router  # noqa: PLC0415
+
+    # lifespan приложения здесь не запускается — очередь покупок и пул async-движка ведём сами
+    if settings.purchase_queue_enabled:
+        purchase_queue.start()
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for route in [*items_router.routes, *users_router.routes]:
+            for method in sorted(route.methods):
+                name = f"{method} {route.path}"
+                if (method, route.path) not in SCENARIOS:
+                    print(f"{name}: нет сценария, пропускаем", file=sys.stderr)
+                    continue
+                stats = results[name] = await drive(client, dataset, (method, route.path), requests, concurrency)
+                print(
+                    f"{name}: {stats.throughput} req/s, "
+                    f"p50 {stats.p50_ms} ms, p95 {stats.p95_ms} ms, p99 {stats.p99_ms} ms",
+                )
+
+    purchase_queue.stop()
+    # без dispose процесс не завершится
+    if async_engine is not None:
+        await async_engine.dispose()
+    return results
+
+
+def regressions(current: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    thresholds = baseline["thresholds"]
+    failures = []
+    for name, stats in current["routes"].items():
+        before = baseline["routes"].get(name)
+        if before is None:
+            continue
+        if stats["p95_ms"] > before["p95_ms"] * (1 + thresholds["p95_increase"]):
+            failures.append(f"{name}: p95 {before['p95_ms']} -> {stats['p95_ms']} ms")
+        if stats["throughput"] < before["throughput"] * (1 - thresholds["throughput_drop"]):
+            failures.append(f"{name}: throughput {before['throughput']} -> {stats['throughput']} req/s")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=200, help="запросов на каждый роут")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--p95-increase", type=float, default=0.2, help="допустимый рост p95 (доля)")
+    parser.add_argument("--throughput-drop", type=float, default=0.2, help="допустимое падение throughput (доля)")
+    parser.add_argument("--database-url", help="по умолчанию — временный SQLite-файл")
+    args = parser.parse_args()
+
+    # базовый прогон читаем до записи результата: иначе при совпадении путей он сравнивался бы сам с собой
+    baseline = None
+    if args.baseline:
+        if Path(args.baseline).resolve() == Path(args.output).resolve():
+            parser.error("--output must differ from --baseline, otherwise the run overwrites its own baseline")
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # URL базы нужно задать до импорта core.config — поэтому модули приложения импортируются внутри функций
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp_dir}/bench.db"
+        dataset = Dataset(args.items, args.users, args.requests)
+
+        started = time.perf_counter()
+        seed(dataset)
+        print(f"seed: {dataset.total_items} items, {dataset.total_users} users, {time.perf_counter() - started:.1f} s")
+
+        routes = asyncio.run(run(dataset, args.requests, args.concurrency))
+
+    result = {
+        "config": {
+            "items": args.items,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "async_mode": os.environ.get("ASYNC_MODE", ""),
+        },
+        "thresholds": {"p95_increase": args.p95_increase, "throughput_drop": args.throughput_drop},
+        "routes": {name: stats.model_dump() for name, stats in routes.items()},
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(result, file, ensure_ascii=False, indent=4)
+
+    if baseline is not None:
+        failures = regressions(result, baseline)
+        if failures:
+            print("Регрессии относительно", args.baseline, *failures, sep="\n")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
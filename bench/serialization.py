@@ -0,0 +1,84 @@
+"""Стоимость сериализации строки списка: старый путь против проекций и orjson.
+
+before: ORM-объект -> model_dump -> схема -> повторная валидация -> json.dumps
+after:  проекция колонок -> model_construct -> orjson
+
+Запуск: python -m bench.serialization --rows 10000
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from items.crud import item_read_all
+from items.model import Item, ItemPage, ItemReadShort
+
+
+def seed(session: Session, rows: int) -> None:
+    values = [
+        {
+            "name": f"item {n}",
+            "description": "x" * 64,
+            "price": n % 1000,
+            "quantity_in_stock": 10,
+            "adult_product": n % 2 == 0,
+        }
+        for n in range(rows)
+    ]
+    session.execute(insert(Item), values)
+    session.commit()
+
+
+def before(session: Session, rows: int) -> bytes:
+    items = session.exec(select(Item).limit(rows)).all()
+    content = [ItemReadShort(**item.model_dump()) for item in items]
+    # то, что FastAPI делал с ответом: валидация по response_model, dump в json-совместимые типы, json.dumps
+    adapter = TypeAdapter(list[ItemReadShort])
+    content = adapter.dump_python(adapter.validate_python(content, from_attributes=True), mode="json")
+    return JSONResponse(content).body
+
+
+def after(session: Session, rows: int) -> bytes:
+    page = item_read_all(session, limit=rows)
+    adapter = TypeAdapter(ItemPage)
+    content = adapter.dump_python(adapter.validate_python(page), mode="json")
+    return ORJSONResponse(content).body
+
+
+def measure(call: Callable[[Session, int], bytes], session: Session, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        session.expunge_all()
+        start = time.perf_counter()
+        call(session, rows)
+        best = min(best, time.perf_counter() - start)
+    return best / rows * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bench_engine = create_engine("sqlite://", poolclass=StaticPool)
+    SQLModel.metadata.create_all(bench_engine)
+    with Session(bench_engine) as session:
+        seed(session, args.rows)
+        before_us = measure(before, session, args.rows, args.repeat)
+        after_us = measure(after, session, args.rows, args.repeat)
+
+    print(f"rows: {args.rows}")
+    print(f"before: {before_us:.2f} us/row")
+    print(f"after:  {after_us:.2f} us/row")
+    print(f"speedup: {before_us / after_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
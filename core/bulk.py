@@ -0,0 +1,155 @@
+"""Массовые операции: пачки через executemany, commit на каждую пачку, ошибки — по строкам.
+
+Строки приходят сырыми и валидируются по одной: невалидная строка попадает в errors со своим
+индексом, а не отклоняет весь запрос с 422.
+"""
+
+from collections.abc import Sequence
+from itertools import batched
+from typing import Any
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import Executable, delete, insert, update
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session, SQLModel
+
+from core.config import settings
+from core.database import begin_write, existing_keys
+
+
+class BulkError(SQLModel):
+    index: int
+    id: int | None = None
+    detail: str
+
+
+class BulkResult(SQLModel):
+    processed: int = 0
+    ids: list[int] = []
+    errors: list[BulkError] = []
+
+
+def validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, item['loc'])) or 'row'}: {item['msg']}" for item in error.errors())
+
+
+def _validate_chunk(
+    adapter: TypeAdapter, chunk: Sequence[tuple[int, Any]], result: BulkResult, *, exclude_unset: bool
+) -> list[tuple[int, dict[str, Any]]]:
+    indexed_rows = []
+    for index, raw in chunk:
+        try:
+            row = adapter.validate_python(raw)
+        except ValidationError as error:
+            raw_id = raw.get("id") if isinstance(raw, dict) else None
+            row_id = raw_id if isinstance(raw_id, int) else None
+            result.errors.append(BulkError(index=index, id=row_id, detail=validation_detail(error)))
+            continue
+        indexed_rows.append((index, row.model_dump(exclude_unset=exclude_unset)))
+    return indexed_rows
+
+
+def _execute(session: Session, statement: Executable, rows: list[dict[str, Any]], *, returning: bool) -> list[int]:
+    result = session.execute(statement, rows)
+    return list(result.scalars()) if returning else [row["id"] for row in rows]
+
+
+def _execute_chunk(
+    session: Session,
+    statement: Executable,
+    indexed_rows: list[tuple[int, dict[str, Any]]],
+    result: BulkResult,
+    *,
+    returning: bool = False,
+):
+    # Пачка целиком в SAVEPOINT; если она падает — повторяем построчно, чтобы найти плохие строки
+    try:
+        with session.begin_nested():
+            ids = _execute(session, statement, [row for _, row in indexed_rows], returning=returning)
+    except DBAPIError:
+        ids = []
+        for index, row in indexed_rows:
+            try:
+                with session.begin_nested():
+                    ids += _execute(session, statement, [row], returning=returning)
+            except DBAPIError as error:
+                result.errors.append(BulkError(index=index, id=row.get("id"), detail=str(error.orig)))
+
+    result.processed += len(ids)
+    result.ids += ids
+
+
+def bulk_insert(
+    session: Session,
+    model: type[SQLModel],
+    schema: type[SQLModel],
+    rows: Sequence[Any],
+    chunk_size: int = settings.bulk_chunk_size,
+) -> BulkResult:
+    # RETURNING в порядке параметров: id созданных строк идут в порядке входных данных
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    adapter = TypeAdapter(schema)
+
+    result = BulkResult()
+    for chunk in batched(enumerate(rows), chunk_size, strict=False):
+        indexed_rows = _validate_chunk(adapter, chunk, result, exclude_unset=False)
+        if indexed_rows:
+            begin_write(session)
+            _execute_chunk(session, statement, indexed_rows, result, returning=True)
+            session.commit()
+    return result
+
+
+def bulk_update(
+    session: Session,
+    model: type[SQLModel],
+    schema: type[SQLModel],
+    rows: Sequence[Any],
+    chunk_size: int = settings.bulk_chunk_size,
+) -> BulkResult:
+    # UPDATE по первичному ключу: id из каждой строки уходит в WHERE
+    statement = update(model)
+    if "version" in model.__table__.columns:
+        statement = statement.values(version=model.version + 1)
+    adapter = TypeAdapter(schema)
+
+    result = BulkResult()
+    for chunk in batched(enumerate(rows), chunk_size, strict=False):
+        valid_rows = _validate_chunk(adapter, chunk, result, exclude_unset=True)
+        if not valid_rows:
+            continue
+        begin_write(session)
+        found = existing_keys(session, model.id, {row["id"] for _, row in valid_rows})
+
+        indexed_rows = []
+        for index, row in valid_rows:
+            if row["id"] in found:
+                indexed_rows.append((index, row))
+            else:
+                msg = f"{model.__name__} {row['id']} is not found."
+                result.errors.append(BulkError(index=index, id=row["id"], detail=msg))
+
+        if indexed_rows:
+            _execute_chunk(session, statement, indexed_rows, result)
+        session.commit()
+    return result
+
+
+def bulk_delete(
+    session: Session, model: type[SQLModel], ids: Sequence[int], chunk_size: int = settings.bulk_chunk_size
+) -> BulkResult:
+    result = BulkResult()
+    for chunk in batched(enumerate(ids), chunk_size, strict=False):
+        statement = delete(model).where(model.id.in_({row_id for _, row_id in chunk})).returning(model.id)
+        deleted = set(session.execute(statement.execution_options(synchronize_session=False)).scalars())
+        session.commit()
+
+        for index, row_id in chunk:
+            if row_id in deleted:
+                deleted.discard(row_id)  # повторный id в том же запросе уже удалён
+                result.processed += 1
+                result.ids.append(row_id)
+            else:
+                msg = f"{model.__name__} {row_id} is not found."
+                result.errors.append(BulkError(index=index, id=row_id, detail=msg))
+    return result
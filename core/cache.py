@@ -0,0 +1,136 @@
+"""Кэш для чтения отдельных записей (item_read, user_read).
+
+По умолчанию данные лежат в памяти процесса (LRUCache). Для нескольких воркеров
+можно подключить общий бэкенд — любой объект с интерфейсом CacheBackend: cache.use(backend).
+Без него при workers > 1 кэш выключен: запись сбрасывает ключи только в памяти того воркера,
+который её принял, и остальные до cache_ttl отдавали бы старое тело и старый ETag (ложный 304).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, Protocol
+
+from sqlmodel import SQLModel
+
+from core.config import settings
+
+MISSING = object()
+
+
+class CacheStats(SQLModel):
+    backend: str
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+    maxsize: int
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Any: ...  # MISSING, если ключа нет или он устарел
+
+    def set(self, key: str, value: Any) -> None: ...
+
+    def delete(self, keys: Iterable[str]) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def stats(self) -> CacheStats: ...
+
+
+class LRUCache:
+    """LRU-кэш в памяти процесса с ограничением по размеру и времени жизни записей."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            backend=type(self).__name__,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            size=len(self._data),
+            maxsize=self.maxsize,
+        )
+
+
+class Cache:
+    """Точка входа для CRUD-функций; хранилище можно заменить через use()."""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    def use(self, backend: CacheBackend):
+        self.backend = backend
+
+    def get(self, key: str) -> Any:
+        return self.backend.get(key)
+
+    def set(self, key: str, value: Any):
+        self.backend.set(key, value)
+
+    def invalidate(self, *keys: str):
+        self.backend.delete(keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> CacheStats:
+        return self.backend.stats()
+
+
+def local_cache_maxsize() -> int:
+    # размер 0 выключает кэш
+    return 0 if settings.workers > 1 else settings.cache_maxsize
+
+
+cache = Cache(LRUCache(maxsize=local_cache_maxsize(), ttl=settings.cache_ttl))
@@ -1,9 +1,68 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     database_url: str
+    # async-режим: роуты работают через AsyncSession вместо пула потоков
+    async_mode: bool = False
+    async_database_url: str | None = None
+    # реплики только для чтения (JSON-список URL); на них идут роуты с ReadSessionDep
+    replica_urls: list[str] = []
+    replica_retry_seconds: float = 30.0  # столько упавшая реплика не получает запросов
+    replica_sticky_seconds: float = 5.0  # столько после записи клиент читает с основного
+
+    # пул соединений (для SQLite в памяти не используется)
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = -1
+    pool_pre_ping: bool = False
+
+    # PRAGMA, которые выставляются каждому новому соединению с SQLite
+    sqlite_journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] = "WAL"
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    sqlite_cache_size: int = -64000  # отрицательное значение — размер в КиБ
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_busy_timeout: int = 5000  # мс
+
+    # кэш чтения item/user: размер 0 выключает кэш, ttl в секундах. Кэш в памяти процесса,
+    # поэтому при workers > 1 он выключен — иначе воркеры расходятся после записи; см. core.cache
+    cache_maxsize: int = 10_000
+    cache_ttl: float = 60.0
+
+    # /debug (пул, кэш, профили) и профилирование по заголовку X-Profile. Авторизации у них нет —
+    # включать только там, где до сервиса не доходят чужие запросы
+    debug_endpoints: bool = False
+    # профилирование: доля запросов, которые профилируются без заголовка X-Profile, и размер буфера профилей
+    profile_sample_rate: float = 0.0
+    profile_buffer_size: int = 50
+    profile_top: int = 30  # строк pstats в профиле
+    # запросы дольше порога (мс) логируются с планом; 0 выключает
+    slow_query_ms: float = 200.0
+
+    # сервер: при workers > 1 схему и seed создаёт первый воркер, остальные ждут на файловой блокировке;
+    # кэш чтения в памяти процесса при этом выключается (общий бэкенд подключается через cache.use)
+    host: str = "0.0.0.0"  # noqa: S104
+    port: int = 8000
+    workers: int = 1
+    startup_lock_path: str = "startup.lock"
+    warmup_cache_rows: int = 1000  # item и user, которые кладутся в кэш до готовности воркера; 0 — без прогрева
+
+    # групповой commit покупок: поток-писатель проводит до purchase_batch_size покупок одной транзакцией,
+    # дожидаясь попутчиков не дольше purchase_batch_wait_ms после первой
+    purchase_queue_enabled: bool = False
+    purchase_batch_size: int = 64
+    purchase_batch_wait_ms: float = 2.0
+
     adult_age: int = 18
+    log_level: str = "INFO"
+    seed_batch_size: int = 500
+    bulk_chunk_size: int = 500
+    page_size: int = 100
+    max_page_size: int = 1000
+    export_batch_size: int = 1000  # строк на одну пачку потоковой выгрузки
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
 
@@ -0,0 +1,53 @@
+"""ETag и условные GET-запросы.
+
+У отдельной записи ETag — id и версия строки, у страницы списка — отпечаток её окна ключей:
+число строк, сумма id и сумма версий. Оба считаются без чтения и сериализации тела,
+поэтому при совпадении If-None-Match ответ 304 обходится одним лёгким запросом.
+"""
+
+from typing import Any
+
+from fastapi import Request, Response
+from sqlalchemy import Row, Select
+from sqlmodel import SQLModel, func, select
+from starlette import status
+
+
+def resource_etag(*parts: object) -> str:
+    return '"' + "-".join(map(str, parts)) + '"'
+
+
+def collection_etag(fingerprint: Row[Any]) -> str:
+    # отпечаток не побайтовый — тег слабый
+    return "W/" + resource_etag(*fingerprint)
+
+
+def page_fingerprint_statement(model: type[SQLModel], limit: int, after: int | None) -> Select:
+    # то же окно, что у keyset-страницы, вместе с лишней строкой, по которой считается next_cursor
+    page = select(model.id, model.version).order_by(model.id).limit(limit + 1)
+    if after is not None:
+        page = page.where(model.id > after)
+    page = page.subquery()
+    return select(
+        func.count(),
+        func.coalesce(func.sum(page.c.id), 0),
+        func.coalesce(func.sum(page.c.version), 0),
+    ).select_from(page)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # для If-None-Match сравнение слабое: W/ не учитывается
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def conditional(request: Request, response: Response, etag: str) -> Response | None:
+    """Ставит ETag в ответ; если клиент прислал тот же тег — возвращает готовый 304 без тела."""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
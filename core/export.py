@@ -0,0 +1,91 @@
+"""Потоковая выгрузка таблиц в NDJSON/CSV.
+
+Строки читаются пачками по export_batch_size (yield_per — курсор на стороне сервера, где драйвер это умеет),
+каждая пачка сразу кодируется и уходит клиенту, поэтому память не зависит от размера таблицы.
+Выгрузка открывает свою сессию: она живёт, пока отдаётся тело ответа, а не пока работает эндпоинт.
+"""
+
+import csv
+import io
+import zlib
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Literal
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.config import settings
+from core.database import async_engine, engine
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class ExportEncoder:
+    def __init__(self, columns: Sequence[str], export_format: ExportFormat, *, gzip: bool):
+        self.columns = list(columns)
+        self.export_format = export_format
+        # wbits=31 — gzip-обёртка вокруг deflate, тот же формат, что у gzip-файла
+        self._compressor = zlib.compressobj(wbits=31) if gzip else None
+
+    def header(self) -> bytes:
+        if self.export_format != "csv":
+            return b""
+        return self._compress(self._csv([self.columns]))
+
+    def encode(self, rows: Sequence[Any]) -> bytes:
+        if self.export_format == "csv":
+            return self._compress(self._csv(rows))
+        return self._compress(b"".join(orjson.dumps(dict(zip(self.columns, row, strict=True))) + b"\n" for row in rows))
+
+    def finish(self) -> bytes:
+        return self._compressor.flush() if self._compressor is not None else b""
+
+    def _csv(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def _compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) if self._compressor is not None else data
+
+
+def export_chunks(statement: Select, export_format: ExportFormat, *, gzip: bool) -> Iterator[bytes]:
+    with Session(engine) as session:
+        result = session.execute(statement.execution_options(yield_per=settings.export_batch_size))
+        encoder = ExportEncoder(result.keys(), export_format, gzip=gzip)
+        if header := encoder.header():
+            yield header
+        for partition in result.partitions():
+            # сжатый поток отдаёт байты не на каждую пачку — пустые куски не отправляем
+            if chunk := encoder.encode(partition):
+                yield chunk
+        yield encoder.finish()
+
+
+async def async_export_chunks(statement: Select, export_format: ExportFormat, *, gzip: bool) -> AsyncIterator[bytes]:
+    async with AsyncSession(async_engine) as session:
+        result = await session.stream(statement.execution_options(yield_per=settings.export_batch_size))
+        encoder = ExportEncoder(result.keys(), export_format, gzip=gzip)
+        if header := encoder.header():
+            yield header
+        async for partition in result.partitions():
+            if chunk := encoder.encode(partition):
+                yield chunk
+        yield encoder.finish()
+
+
+def export_response(
+    chunks: Iterator[bytes] | AsyncIterator[bytes], name: str, export_format: ExportFormat, *, gzip: bool
+) -> StreamingResponse:
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{export_format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[export_format], headers=headers)
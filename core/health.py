@@ -0,0 +1,33 @@
+"""Liveness и readiness для балансировщика.
+
+/health отвечает, пока процесс жив. /ready — только когда воркер прогрет (app.state.ready
+выставляет lifespan) и база отвечает, иначе 503: трафик идёт только на тёплые воркеры.
+"""
+
+from fastapi import APIRouter, Request, Response
+from sqlalchemy.exc import SQLAlchemyError
+from starlette import status
+
+from core.database import engine
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/health", status_code=status.HTTP_200_OK)
+def get_health() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+@router.get("/ready", status_code=status.HTTP_200_OK)
+def get_ready(request: Request, response: Response) -> dict[str, str]:
+    if not getattr(request.app.state, "ready", False):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting"}
+
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+    except SQLAlchemyError:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "database unavailable"}
+    return {"status": "ready"}
@@ -0,0 +1,171 @@
+"""Метрики в формате Prometheus: латентность по роутам и SQL-запросы на каждый запрос.
+
+MetricsMiddleware меряет запрос целиком и кладёт в ContextVar счётчик запросов к базе,
+который пополняют события движка (instrument_engine). Sync-эндпоинты выполняются в пуле
+потоков с копией контекста — объект в ней тот же, поэтому счёт не теряется.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import Engine, event
+from starlette import status
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+
+# запросы, не попавшие ни в один роут, — одной меткой, чтобы не плодить серии на каждый 404
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последний — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip((*map(str, self.buckets), "+Inf"), self.counts, strict=True):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class RequestQueries:
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+current_queries: ContextVar[RequestQueries | None] = ContextVar("current_queries", default=None)
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: object) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: defaultdict[tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.requests: Counter[tuple[str, str, int]] = Counter()
+        self.db_queries: Counter[tuple[str, str]] = Counter()
+        self.db_time: defaultdict[tuple[str, str], float] = defaultdict(float)
+
+    def observe_request(self, method: str, route: str, status_code: int, duration: float, queries: RequestQueries):
+        with self._lock:
+            self.latency[method, route].observe(duration)
+            self.requests[method, route, status_code] += 1
+            self.db_queries[method, route] += queries.count
+            self.db_time[method, route] += queries.duration
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP http_request_duration_seconds Request latency by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self.latency.items()):
+                for bound, count in histogram.cumulative():
+                    labels = _labels(method=method, route=route, le=bound)
+                    lines.append(f"http_request_duration_seconds_bucket{labels} {count}")
+                labels = _labels(method=method, route=route)
+                lines.append(f"http_request_duration_seconds_sum{labels} {histogram.sum}")
+                lines.append(f"http_request_duration_seconds_count{labels} {histogram.count}")
+
+            lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+            for (method, route, status_code), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status_code)} {count}")
+
+            lines += ["# HELP db_queries_total SQL statements by route.", "# TYPE db_queries_total counter"]
+            for (method, route), count in sorted(self.db_queries.items()):
+                lines.append(f"db_queries_total{_labels(method=method, route=route)} {count}")
+
+            lines += [
+                "# HELP db_query_duration_seconds_total Time spent in SQL statements by route.",
+                "# TYPE db_query_duration_seconds_total counter",
+            ]
+            for (method, route), duration in sorted(self.db_time.items()):
+                lines.append(f"db_query_duration_seconds_total{_labels(method=method, route=route)} {duration}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001, PLR0913
+    context.metrics_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001, PLR0913
+    queries = current_queries.get()
+    if queries is not None:
+        queries.count += 1
+        queries.duration += time.perf_counter() - context.metrics_started
+
+
+def instrument_engine(db_engine: Engine) -> Engine:
+    event.listen(db_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(db_engine, "after_cursor_execute", after_cursor_execute)
+    return db_engine
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = current_queries.set(queries)
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        started = time.perf_counter()
+
+        async def send_with_query_count(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(QUERY_COUNT_HEADER, str(queries.count))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_query_count)
+        finally:
+            current_queries.reset(token)
+            # роутер FastAPI кладёт найденный роут в scope — берём шаблон пути, а не сам путь
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            metrics.observe_request(scope["method"], route_path, status_code, time.perf_counter() - started, queries)
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+def get_metrics() -> str:
+    return metrics.render()
@@ -0,0 +1,12 @@
+from sqlmodel import Field, SQLModel
+
+
+class SeedFingerprint(SQLModel, table=True):
+    # хэш содержимого seed-файла, из которого последний раз заполнялась база
+    path: str = Field(primary_key=True)
+    sha256: str
+
+
+class Versioned(SQLModel):
+    # растёт на каждом UPDATE строки, из него строится ETag; server_default — для ALTER TABLE на старых базах
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from sqlmodel import SQLModel
+
+
+class PoolStats:
+    """Счётчики выдачи соединений из пула."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, waited: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class _TimedPoolMixin:
+    # время connect() — ожидание свободного соединения (или открытие нового в overflow)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.stats.record_checkout(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class PoolStatus(SQLModel):
+    pool_class: str
+    size: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
+    checkouts: int | None = None
+    wait_seconds_total: float | None = None
+    wait_seconds_max: float | None = None
+
+
+def pool_status(pool: Pool) -> PoolStatus:
+    status = PoolStatus(pool_class=type(pool).__name__)
+    if isinstance(pool, QueuePool):
+        status.size = pool.size()
+        status.checked_out = pool.checkedout()
+        status.overflow = max(pool.overflow(), 0)
+    stats: PoolStats | None = getattr(pool, "stats", None)
+    if stats is not None:
+        status.checkouts = stats.checkouts
+        status.wait_seconds_total = stats.wait_seconds_total
+        status.wait_seconds_max = stats.wait_seconds_max
+    return status
@@ -0,0 +1,249 @@
+"""Профилирование отдельных запросов и планы медленных SQL-запросов.
+
+Запрос профилируется, если пришёл с заголовком X-Profile (только при debug_endpoints) или попал
+в выборку profile_sample_rate. ProfilerMiddleware помечает такой запрос через ContextVar, а ProfiledRoute
+запускает cProfile вокруг эндпоинта в том потоке, где он выполняется (sync-эндпоинты — в пуле потоков).
+Одновременно профилируется только один запрос.
+Последние profile_buffer_size профилей лежат в кольцевом буфере и отдаются из /debug/profiles (при debug_endpoints).
+"""
+
+import cProfile
+import functools
+import inspect
+import io
+import itertools
+import logging
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from typing import Any
+
+from fastapi.routing import APIRoute
+from sqlalchemy import Engine, event
+from sqlmodel import SQLModel
+from starlette import status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import settings
+from core.metrics import current_queries
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+# с этого начинаются запросы, для которых есть смысл смотреть план
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class SlowQuery(SQLModel):
+    statement: str
+    duration_ms: float
+    plan: list[str]
+
+
+class ProfileSummary(SQLModel):
+    id: int
+    method: str
+    path: str
+    status_code: int
+    started_at: datetime
+    duration_ms: float
+    queries: int
+
+
+class ProfileRecord(ProfileSummary):
+    slow_queries: list[SlowQuery] = []
+    stats: str = ""
+
+
+class ActiveProfile:
+    """Данные профилируемого запроса, которые собираются по ходу его выполнения."""
+
+    __slots__ = ("profilers", "slow_queries")
+
+    def __init__(self):
+        self.profilers: list[cProfile.Profile] = []
+        self.slow_queries: list[SlowQuery] = []
+
+    def render_stats(self) -> str:
+        if not self.profilers:
+            return ""
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profilers[0], stream=stream)
+        for profiler in self.profilers[1:]:
+            stats.add(profiler)
+        stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(settings.profile_top)
+        return stream.getvalue()
+
+
+current_profile: ContextVar[ActiveProfile | None] = ContextVar("current_profile", default=None)
+
+
+class ProfileBuffer:
+    def __init__(self, maxsize: int):
+        self._records: deque[ProfileRecord] = deque(maxlen=maxsize)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, record: ProfileRecord):
+        with self._lock:
+            self._records.append(record)
+
+    def list(self) -> list[ProfileRecord]:
+        with self._lock:
+            return list(reversed(self._records))
+
+    def get(self, profile_id: int) -> ProfileRecord | None:
+        with self._lock:
+            return next((record for record in self._records if record.id == profile_id), None)
+
+
+profiles = ProfileBuffer(settings.profile_buffer_size)
+
+
+# cProfile (sys.monitoring в 3.12+) бывает активен только один на весь процесс:
+# пока профилируется один запрос, остальные помеченные выполняются без профиля
+_profiler_lock = threading.Lock()
+
+
+def profiled(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # include_router пересоздаёт роуты с тем же классом — второй раз не оборачиваем
+    if getattr(endpoint, "__profiled__", False):
+        return endpoint
+
+    # functools.wraps сохраняет сигнатуру: FastAPI разбирает зависимости по исходной функции
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_endpoint(*args, **kwargs):
+            profile = current_profile.get()
+            if profile is None or not _profiler_lock.acquire(blocking=False):
+                return await endpoint(*args, **kwargs)
+            # в цикле событий в профиль попадут и другие задачи, которые выполнялись, пока эндпоинт ждал
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+                _profiler_lock.release()
+                profile.profilers.append(profiler)
+
+        async_endpoint.__profiled__ = True
+        return async_endpoint
+
+    @functools.wraps(endpoint)
+    def sync_endpoint(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None or not _profiler_lock.acquire(blocking=False):
+            return endpoint(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(endpoint, *args, **kwargs)
+        finally:
+            _profiler_lock.release()
+            profile.profilers.append(profiler)
+
+    sync_endpoint.__profiled__ = True
+    return sync_endpoint
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+
+class ProfilerMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def should_profile(self, scope: Scope) -> bool:
+        # заголовок — от клиента: без debug_endpoints кто угодно мог бы включить профилирование любого запроса
+        if settings.debug_endpoints and any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            return True
+        return random.random() < settings.profile_sample_rate  # noqa: S311
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = ActiveProfile()
+        token = current_profile.set(profile)
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        started_at = datetime.now(UTC)
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_profile.reset(token)
+            queries = current_queries.get()
+            profiles.add(
+                ProfileRecord(
+                    id=profiles.next_id(),
+                    method=scope["method"],
+                    path=scope["path"],
+                    status_code=status_code,
+                    started_at=started_at,
+                    duration_ms=(time.perf_counter() - started) * 1000,
+                    queries=queries.count if queries is not None else 0,
+                    slow_queries=profile.slow_queries,
+                    stats=profile.render_stats(),
+                ),
+            )
+
+
+def explain(conn, statement: str, parameters: Any) -> list[str]:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    # отдельный DBAPI-курсор: курсор самого запроса ещё не дочитан, а события движка на EXPLAIN не нужны
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001, PLR0913
+    context.profiler_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001, PLR0913
+    duration_ms = (time.perf_counter() - context.profiler_started) * 1000
+    if duration_ms < settings.slow_query_ms or executemany:
+        return
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return
+
+    try:
+        plan = explain(conn, statement, parameters)
+    except Exception as error:  # noqa: BLE001
+        plan = [f"EXPLAIN failed: {error}"]
+    logger.warning("Slow query %.1f ms: %s\nplan: %s", duration_ms, statement, "; ".join(plan))
+
+    profile = current_profile.get()
+    if profile is not None:
+        profile.slow_queries.append(SlowQuery(statement=statement, duration_ms=duration_ms, plan=plan))
+
+
+def capture_slow_queries(db_engine: Engine) -> Engine:
+    if settings.slow_query_ms > 0:
+        event.listen(db_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(db_engine, "after_cursor_execute", after_cursor_execute)
+    return db_engine
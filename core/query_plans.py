@@ -0,0 +1,167 @@
+"""Проверка планов горячих CRUD-запросов: ни один из них не должен сканировать таблицу целиком.
+
+Перед замером в базу (и на пустую тоже) вставляются пробные строки: пользователь с корзиной и
+двумя товарами. Без них запросы, которые идут за найденными строками (selectinload товаров,
+строки корзины), на пустой базе не выполнялись бы и не попадали в проверку. Всё откатывается.
+
+Запуск: python -m core.query_plans
+"""
+
+import sys
+from collections.abc import Callable
+from contextlib import suppress
+from typing import Any, NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import Engine, event, insert
+from sqlmodel import Session, SQLModel
+
+from core.cache import cache
+from core.database import create_db_and_tables, engine, existing_keys
+from items.crud import (
+    item_cache_key,
+    item_calculate_total_price,
+    item_read,
+    item_read_all,
+    items_filter_by_owner_id,
+    items_page_etag,
+    items_search,
+)
+from items.model import Item, ItemSearch
+from users.crud import (
+    cart_create_statement,
+    cart_link_statement,
+    cart_totals_statement,
+    user_cache_key,
+    user_read,
+    user_read_all,
+    user_read_cart,
+    user_with_items_model,
+    users_page_etag,
+    users_with_items,
+)
+from users.model import CartItem, User
+
+PROBE_USER = {
+    "first_name": "probe",
+    "last_name": "probe",
+    "email": "probe@example.com",
+    "age": 30,
+    "sex": "probe",
+    "balance": 0,
+}
+PROBE_ITEM = {"name": "probe", "description": "probe", "price": 15, "quantity_in_stock": 1, "adult_product": True}
+
+
+class Probe(NamedTuple):
+    user_id: int
+    item_ids: list[int]
+    cart_id: int
+
+
+HOT_QUERIES: dict[str, Callable[[Session, Probe], Any]] = {
+    "item_read": lambda session, probe: item_read(probe.item_ids[0], session),
+    "item_read_all": lambda session, probe: item_read_all(session, after=probe.item_ids[0]),
+    "items_page_etag": lambda session, probe: items_page_etag(session, after=probe.item_ids[0]),
+    "items_filter_by_owner_id": lambda session, probe: items_filter_by_owner_id(probe.user_id, session),
+    "item_calculate_total_price": lambda session, probe: item_calculate_total_price(probe.item_ids, session),
+    "items_search_text": lambda session, _: items_search(ItemSearch(q="probe"), session),
+    "items_search_price": lambda session, _: items_search(ItemSearch(min_price=10, max_price=20), session),
+    "items_search_adult": lambda session, _: items_search(ItemSearch(adult_product=True, max_price=20), session),
+    "user_read": lambda session, probe: user_read(probe.user_id, session),
+    "user_read_all": lambda session, probe: user_read_all(session, after=probe.user_id),
+    "users_page_etag": lambda session, probe: users_page_etag(session, after=probe.user_id),
+    "user_with_items_model": lambda session, probe: user_with_items_model(probe.user_id, session),
+    "users_with_items": lambda session, probe: users_with_items([probe.user_id], session),
+    "user_read_cart": lambda session, probe: user_read_cart(probe.user_id, session),
+    "cart_totals": lambda session, probe: session.exec(cart_totals_statement(probe.cart_id)).one(),
+    "seed_users": lambda session, _: existing_keys(session, User.email, {PROBE_USER["email"]}),
+    "seed_items": lambda session, _: existing_keys(session, Item.name, {PROBE_ITEM["name"]}),
+}
+
+
+class QueryPlanError(Exception):
+    pass
+
+
+def insert_probe(session: Session) -> Probe:
+    # Core-вставки, а не ORM-объекты: в identity map сессии не остаётся готовых связей,
+    # и selectinload идёт за товарами в базу, как в обычном запросе
+    user_id = session.execute(insert(User).values(**PROBE_USER).returning(User.id)).scalar_one()
+    item_rows = [PROBE_ITEM | {"owner_id": user_id}] * 2
+    item_ids = list(session.execute(insert(Item).returning(Item.id, sort_by_parameter_order=True), item_rows).scalars())
+    cart_id = session.execute(cart_create_statement(user_id)).one().id
+    session.execute(cart_link_statement(user_id, cart_id))
+    session.execute(insert(CartItem), [{"cart_id": cart_id, "item_id": item_id, "qty": 1} for item_id in item_ids])
+    return Probe(user_id, item_ids, cart_id)
+
+
+def capture_statements(call: Callable[[Session, Probe], Any], db_engine: Engine) -> list[tuple[str, Any]]:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001, PLR0913
+        statements.append((statement, parameters))
+
+    with Session(db_engine) as session:
+        probe = insert_probe(session)
+        probe_keys = [user_cache_key(probe.user_id), *map(item_cache_key, probe.item_ids)]
+        event.listen(db_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            # ошибка бизнес-проверки не мешает проверить сами запросы
+            with suppress(HTTPException):
+                call(session, probe)
+        finally:
+            event.remove(db_engine, "before_cursor_execute", before_cursor_execute)
+            session.rollback()
+            # пробные строки откачены — их id достанутся настоящим строкам, в кэше их быть не должно
+            cache.invalidate(*probe_keys)
+    return statements
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    tables = set(SQLModel.metadata.tables)
+    scans = []
+    for detail in plan:
+        # "SCAN item" / "SCAN TABLE item" без "USING ... INDEX" — полный проход по таблице
+        words = detail.split()
+        if words[0] != "SCAN" or "USING" in words:
+            continue
+        table = words[2] if words[1] == "TABLE" else words[1]
+        if table in tables:
+            scans.append(detail)
+    return scans
+
+
+def check_query_plans(db_engine: Engine = engine) -> dict[str, list[str]]:
+    if db_engine.dialect.name != "sqlite":
+        msg = f"EXPLAIN QUERY PLAN is only supported for SQLite, got {db_engine.dialect.name}"
+        raise QueryPlanError(msg)
+
+    plans = {}
+    failures = []
+    for name, call in HOT_QUERIES.items():
+        plans[name] = []
+        statements = capture_statements(call, db_engine)
+        if not statements:
+            failures.append(f"{name}: no statements executed")
+        for statement, parameters in statements:
+            with db_engine.connect() as conn:
+                rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plan = [row[-1] for row in rows]
+            plans[name].extend(plan)
+            failures.extend(f"{name}: {detail}" for detail in full_scans(plan))
+
+    if failures:
+        msg = "Query plan check failed:\n" + "\n".join(failures)
+        raise QueryPlanError(msg)
+    return plans
+
+
+if __name__ == "__main__":
+    create_db_and_tables()
+    try:
+        for query, query_plan in check_query_plans().items():
+            print(f"{query}: {'; '.join(query_plan)}")
+    except QueryPlanError as error:
+        print(error)
+        sys.exit(1)
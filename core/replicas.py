@@ -0,0 +1,89 @@
+"""Чтение с реплик.
+
+Роуты только для чтения берут сессию через ReadSessionDep: движки реплик из replica_urls
+выдаются по кругу, запись идёт на основной. Запрос, упавший на реплике (нет соединения,
+нет таблиц, ошибка диска), повторяется на основном, а сама реплика на replica_retry_seconds
+выводится из оборота — чтение в это время идёт с основного.
+
+Read-your-writes: после успешного запроса на запись ReadYourWritesMiddleware ставит куку
+с меткой времени, и до неё чтение этого клиента идёт с основного — отставание реплики
+не прячет от клиента его же изменения. Кука, а не память процесса, — её видят все воркеры.
+"""
+
+import itertools
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Any
+
+from fastapi import Request
+from starlette import status
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+STICKY_COOKIE = "db_primary_until"
+
+# запросы, после которых клиент не обязан видеть свою запись
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class ReplicaSet:
+    """Движки реплик (sync или async) с круговой выдачей и выводом упавших из оборота."""
+
+    def __init__(self, engines: list[Any], retry_seconds: float):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        # движок -> момент (monotonic), до которого реплика не выдаётся
+        self._unhealthy_until: dict[int, float] = {}
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def pick(self) -> Any | None:
+        # None — здоровых реплик нет, читаем с основного
+        now = time.monotonic()
+        with self._lock:
+            start = next(self._turn)
+            for offset in range(len(self.engines)):
+                db_engine = self.engines[(start + offset) % len(self.engines)]
+                if self._unhealthy_until.get(id(db_engine), 0.0) <= now:
+                    return db_engine
+        return None
+
+    def mark_unhealthy(self, db_engine: Any):
+        with self._lock:
+            self._unhealthy_until[id(db_engine)] = time.monotonic() + self.retry_seconds
+
+
+def reads_own_writes(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def sticky_cookie(sticky_seconds: float) -> str:
+    cookie = SimpleCookie()
+    cookie[STICKY_COOKIE] = f"{time.time() + sticky_seconds:.3f}"
+    cookie[STICKY_COOKIE]["max-age"] = int(sticky_seconds) + 1
+    cookie[STICKY_COOKIE]["path"] = "/"
+    cookie[STICKY_COOKIE]["httponly"] = True
+    return cookie.output(header="").strip()
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app: ASGIApp, sticky_seconds: float):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            # неудачная запись ничего не изменила — клиента на основной не переводим
+            if message["type"] == "http.response.start" and message["status"] < status.HTTP_400_BAD_REQUEST:
+                MutableHeaders(scope=message).append("set-cookie", sticky_cookie(self.sticky_seconds))
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
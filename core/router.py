@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException
+from starlette import status
+
+from core.cache import CacheStats, cache
+from core.database import async_engine, engine
+from core.pool import PoolStatus, pool_status
+from core.profiler import ProfileRecord, ProfileSummary, profiles
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/pool", status_code=status.HTTP_200_OK)
+def get_pool_status() -> dict[str, PoolStatus]:
+    pools = {"sync": pool_status(engine.pool)}
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.pool)
+    return pools
+
+
+@router.get("/cache", status_code=status.HTTP_200_OK)
+def get_cache_stats() -> CacheStats:
+    return cache.stats()
+
+
+@router.get("/profiles", status_code=status.HTTP_200_OK)
+def get_profiles() -> list[ProfileSummary]:
+    return profiles.list()
+
+
+@router.get("/profiles/{profile_id}", status_code=status.HTTP_200_OK)
+def get_profile(profile_id: int) -> ProfileRecord:
+    record = profiles.get(profile_id)
+    if record is None:
+        msg = f"Profile {profile_id} is not found."
+        raise HTTPException(status_code=404, detail=msg)
+    return record
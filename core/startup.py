@@ -0,0 +1,39 @@
+"""Старт воркера: схема и сид под файловой блокировкой, прогрев пула перед готовностью.
+
+Несколько воркеров uvicorn стартуют одновременно. Блокировка выстраивает их в очередь:
+первый создаёт таблицы и заливает seed, остальные видят готовую схему и неизменившийся
+отпечаток seed-файла и проходят этот шаг почти мгновенно.
+"""
+
+import fcntl
+from collections.abc import Iterator
+from contextlib import AsyncExitStack, ExitStack, contextmanager
+from pathlib import Path
+
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@contextmanager
+def startup_lock(path: str) -> Iterator[None]:
+    # flock снимается ядром и при падении процесса — зависшей блокировки не остаётся
+    with Path(path).open("a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def warm_pool(db_engine: Engine, size: int):
+    # держим size соединений одновременно, иначе пул раз за разом отдаёт одно и то же
+    with ExitStack() as stack:
+        for _ in range(size):
+            stack.enter_context(db_engine.connect()).exec_driver_sql("SELECT 1")
+
+
+async def async_warm_pool(db_engine: AsyncEngine, size: int):
+    async with AsyncExitStack() as stack:
+        for _ in range(size):
+            connection = await stack.enter_async_context(db_engine.connect())
+            await connection.exec_driver_sql("SELECT 1")
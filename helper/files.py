@@ -1,10 +1,15 @@
 import json
 import os
+import re
+from collections.abc import Iterator
+from typing import IO, Any
 
 DATABASE_PATH = "data.json"
 
 DEFAULT_DATA = {"users": {}, "items": {}}
 
+_WHITESPACE = re.compile(r"\s*")
+
 
 def ensure_file_exists(path=DATABASE_PATH):
     """Создаёт файл, если он не существует."""
@@ -31,3 +36,79 @@ def write_json(data, path=DATABASE_PATH):
     """Записывает данные (словарь/список) в JSON-файл."""
     with open(path, "w", encoding="utf-8") as file:
         json.dump(data, file, ensure_ascii=False, indent=4)
+
+
+class _JsonStream:
+    """Буферизованный разбор JSON-файла по частям."""
+
+    def __init__(self, file: IO[str], chunk_size: int):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            return False
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or not self._fill():
+                return
+
+    def consume(self, char: str) -> bool:
+        self._skip_whitespace()
+        if self._buffer.startswith(char, self._pos):
+            self._pos += 1
+            return True
+        return False
+
+    def expect(self, char: str):
+        if not self.consume(char):
+            msg = f"Expecting {char!r}"
+            raise json.JSONDecodeError(msg, self._buffer, self._pos)
+
+    def value(self) -> Any:
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Значение упирается в конец буфера (например, число) — дочитываем и разбираем заново
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def iter_json_records(path=DATABASE_PATH, chunk_size: int = 64 * 1024) -> Iterator[tuple[str, Any]]:
+    """Потоково читает JSON вида {"секция": [запись, ...]} и отдаёт пары (секция, запись).
+
+    Файл не загружается целиком: в памяти держится только текущая запись и буфер чтения.
+    Секции-словари ({"id": запись}) отдаются по значениям.
+    """
+    with open(path, encoding="utf-8") as file:
+        stream = _JsonStream(file, chunk_size)
+        stream.expect("{")
+        while not stream.consume("}"):
+            section = stream.value()
+            stream.expect(":")
+            if stream.consume("["):
+                while not stream.consume("]"):
+                    yield section, stream.value()
+                    stream.consume(",")
+            else:
+                value = stream.value()
+                if isinstance(value, dict):
+                    for record in value.values():
+                        yield section, record
+            stream.consume(",")
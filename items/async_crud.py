@@ -0,0 +1,146 @@
+"""Async-версии функций из items.crud для работы через AsyncSession."""
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.schema import CreateTable
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.cache import MISSING, cache
+from core.config import settings
+from core.database import is_primary
+from core.etag import collection_etag, page_fingerprint_statement
+from items.crud import (
+    ITEM_QUANTITIES,
+    ITEM_READ_COLUMNS,
+    ITEM_SHORT_COLUMNS,
+    inventory_value_page,
+    inventory_value_statement,
+    item_cache_key,
+    item_create_statement,
+    item_delete_statement,
+    item_page,
+    item_quantities,
+    item_update_statement,
+    items_by_owner_statement,
+    items_search_statement,
+    nearest_rank,
+    owner_items,
+    price_percentiles,
+    prices_at_ranks_statement,
+    quantity_rows,
+    stock_split,
+    stock_split_statement,
+    total_price_fits_inline,
+    total_price_joined_statement,
+    total_price_statement,
+)
+from items.model import (
+    Item,
+    ItemCreate,
+    ItemPage,
+    ItemQuantity,
+    ItemRead,
+    ItemSearch,
+    ItemUpdate,
+    OwnerInventoryPage,
+    PricePercentiles,
+    StockSplit,
+)
+
+
+async def item_create(item_in: ItemCreate, session: AsyncSession) -> ItemRead:
+    row = (await session.execute(item_create_statement(item_in))).one()
+    await session.commit()
+    return ItemRead.model_construct(**row._mapping)
+
+
+async def item_read(item_id: int, session: AsyncSession) -> ItemRead:
+    cached = cache.get(item_cache_key(item_id))
+    if cached is not MISSING:
+        return cached
+
+    row = (await session.exec(select(*ITEM_READ_COLUMNS).where(Item.id == item_id))).first()
+    if not row:
+        msg = f"Item {item_id} is not found."
+        raise HTTPException(status_code=404, detail=msg)
+
+    item_out = ItemRead.model_construct(**row._mapping)
+    if is_primary(session):
+        cache.set(item_cache_key(item_id), item_out)
+    return item_out
+
+
+async def item_read_all(session: AsyncSession, limit: int = settings.page_size, after: int | None = None) -> ItemPage:
+    statement = select(*ITEM_SHORT_COLUMNS).order_by(Item.id).limit(limit + 1)
+    if after is not None:
+        statement = statement.where(Item.id > after)
+
+    return item_page((await session.exec(statement)).all(), limit)
+
+
+async def items_page_etag(session: AsyncSession, limit: int = settings.page_size, after: int | None = None) -> str:
+    return collection_etag((await session.exec(page_fingerprint_statement(Item, limit, after))).one())
+
+
+async def item_delete(item_id: int, session: AsyncSession) -> str:
+    if (await session.execute(item_delete_statement(item_id))).first() is None:
+        msg = f"Item {item_id} is not found."
+        raise HTTPException(status_code=404, detail=msg)
+    await session.commit()
+    cache.invalidate(item_cache_key(item_id))
+    return f"Предмет с id {item_id} удален"
+
+
+async def item_update(item_id: int, item_in: ItemUpdate, session: AsyncSession) -> ItemRead:
+    row = (await session.execute(item_update_statement(item_id, item_in))).first()
+    if row is None:
+        msg = f"Item {item_id} is not found."
+        raise HTTPException(status_code=404, detail=msg)
+    await session.commit()
+    cache.invalidate(item_cache_key(item_id))
+    return ItemRead.model_construct(**row._mapping)
+
+
+async def items_filter_by_owner_id(owner_id: int, session: AsyncSession) -> list[ItemRead]:
+    return owner_items((await session.exec(items_by_owner_statement(owner_id))).all(), owner_id)
+
+
+async def item_calculate_total_price(lines: list[int | ItemQuantity], session: AsyncSession) -> float:
+    quantities = item_quantities(lines)
+    if not quantities:
+        return 0.0
+    if total_price_fits_inline(quantities):
+        return float((await session.execute(total_price_statement(quantities))).scalar_one())
+
+    await session.execute(CreateTable(ITEM_QUANTITIES, if_not_exists=True))
+    try:
+        await session.execute(insert(ITEM_QUANTITIES), quantity_rows(quantities))
+        return float((await session.execute(total_price_joined_statement())).scalar_one())
+    finally:
+        await session.rollback()
+
+
+async def items_inventory_value(
+    session: AsyncSession, limit: int = settings.page_size, after: int | None = None
+) -> OwnerInventoryPage:
+    rows = (await session.execute(inventory_value_statement(limit, after))).all()
+    return inventory_value_page(rows, limit)
+
+
+async def items_price_percentiles(percentiles: list[float], session: AsyncSession) -> PricePercentiles:
+    count = (await session.exec(select(func.count(Item.id)))).one()
+    prices: dict[int, int] = {}
+    if count and percentiles:
+        ranks = {nearest_rank(percentile, count) for percentile in percentiles}
+        prices = dict((await session.execute(prices_at_ranks_statement(ranks))).tuples().all())
+    return price_percentiles(percentiles, count, prices)
+
+
+async def items_stock_split(session: AsyncSession) -> StockSplit:
+    return stock_split((await session.execute(stock_split_statement())).all())
+
+
+async def items_search(filters: ItemSearch, session: AsyncSession) -> ItemPage:
+    statement = items_search_statement(filters, session.bind.dialect.name)
+    return item_page((await session.exec(statement)).all(), filters.limit)
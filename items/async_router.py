@@ -0,0 +1,119 @@
+"""Async-версии роутов: в async-режиме подключаются поверх синхронных."""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette import status
+
+from core.config import settings
+from core.database import AsyncReadSessionDep, AsyncSessionDep
+from core.etag import conditional, resource_etag
+from core.export import ExportFormat, async_export_chunks, export_response
+from core.profiler import ProfiledRoute
+from items.async_crud import (
+    item_calculate_total_price,
+    item_create,
+    item_delete,
+    item_read,
+    item_read_all,
+    item_update,
+    items_filter_by_owner_id,
+    items_inventory_value,
+    items_page_etag,
+    items_price_percentiles,
+    items_search,
+    items_stock_split,
+)
+from items.crud import DEFAULT_PERCENTILES, items_export_statement
+from items.model import (
+    ItemCreate,
+    ItemPage,
+    ItemQuantity,
+    ItemRead,
+    ItemSearch,
+    ItemUpdate,
+    OwnerInventoryPage,
+    Percentile,
+    PricePercentiles,
+    StockSplit,
+)
+
+router = APIRouter(prefix="/items", tags=["items"], route_class=ProfiledRoute)
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_items(
+    *, export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson", gzip: bool = False
+) -> StreamingResponse:
+    chunks = async_export_chunks(items_export_statement(), export_format, gzip=gzip)
+    return export_response(chunks, "items", export_format, gzip=gzip)
+
+
+@router.get("/search", status_code=status.HTTP_200_OK)
+async def search_items(filters: Annotated[ItemSearch, Query()], session: AsyncSessionDep) -> ItemPage:
+    return await items_search(filters, session)
+
+
+@router.get("/{item_id}", status_code=status.HTTP_200_OK)
+async def get_item(item_id: int, session: AsyncReadSessionDep, request: Request, response: Response) -> ItemRead:
+    item = await item_read(item_id, session)
+    return conditional(request, response, resource_etag(item.id, item.version)) or item
+
+
+@router.post("/{item_id}", status_code=status.HTTP_202_ACCEPTED)
+async def create_item(item_in: ItemCreate, session: AsyncSessionDep) -> ItemRead:
+    return await item_create(item_in, session)
+
+
+@router.get("/", status_code=status.HTTP_200_OK)
+async def read_all_items(
+    request: Request,
+    response: Response,
+    session: AsyncReadSessionDep,
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = settings.page_size,
+    after: int | None = None,
+) -> ItemPage:
+    etag = await items_page_etag(session, limit, after)
+    return conditional(request, response, etag) or await item_read_all(session, limit, after)
+
+
+@router.delete("/{item_id}", status_code=status.HTTP_200_OK)
+async def delete_item(item_id: int, session: AsyncSessionDep) -> str:
+    return await item_delete(item_id, session)
+
+
+@router.patch("/{item_id}", status_code=status.HTTP_200_OK)
+async def update_item(item_id: int, item_in: ItemUpdate, session: AsyncSessionDep) -> ItemRead:
+    return await item_update(item_id, item_in, session)
+
+
+@router.get("/get_by_owner/{owner_id}", status_code=status.HTTP_200_OK)
+async def get_items_by_owner(owner_id: int, session: AsyncSessionDep) -> list[ItemRead]:
+    return await items_filter_by_owner_id(owner_id, session)
+
+
+@router.post("/calculate-total/", status_code=status.HTTP_202_ACCEPTED)
+async def item_calculate_total(items: list[int | ItemQuantity], session: AsyncSessionDep) -> float:
+    return await item_calculate_total_price(items, session)
+
+
+@router.get("/stats/inventory-value", status_code=status.HTTP_200_OK)
+async def get_inventory_value(
+    session: AsyncSessionDep,
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = settings.page_size,
+    after: int | None = None,
+) -> OwnerInventoryPage:
+    return await items_inventory_value(session, limit, after)
+
+
+@router.get("/stats/price-percentiles", status_code=status.HTTP_200_OK)
+async def get_price_percentiles(
+    session: AsyncSessionDep, p: Annotated[list[Percentile] | None, Query()] = None
+) -> PricePercentiles:
+    return await items_price_percentiles(p or DEFAULT_PERCENTILES, session)
+
+
+@router.get("/stats/stock", status_code=status.HTTP_200_OK)
+async def get_stock_split(session: AsyncSessionDep) -> StockSplit:
+    return await items_stock_split(session)
@@ -1,72 +1,349 @@
+import math
+from collections import Counter
 from collections.abc import Sequence
 from typing import Any
 
 from fastapi import HTTPException
+from sqlalchemy import (
+    Column,
+    Delete,
+    Insert,
+    Integer,
+    MetaData,
+    Select,
+    Table,
+    Update,
+    case,
+    delete,
+    insert,
+    or_,
+    update,
+)
+from sqlalchemy.schema import CreateTable
 from sqlmodel import Session, func, select
 
-from items.model import Item, ItemCreate, ItemRead, ItemReadShort, ItemUpdate
+from core.bulk import BulkResult, bulk_delete, bulk_insert, bulk_update
+from core.cache import MISSING, cache
+from core.config import settings
+from core.database import is_primary, schema_columns
+from core.etag import collection_etag, page_fingerprint_statement
+from items.model import (
+    Item,
+    ItemBase,
+    ItemBulkUpdate,
+    ItemCreate,
+    ItemPage,
+    ItemQuantity,
+    ItemRead,
+    ItemReadShort,
+    ItemSearch,
+    ItemUpdate,
+    OwnerInventory,
+    OwnerInventoryPage,
+    PricePercentiles,
+    StockSplit,
+    StockTotals,
+)
+from items.search import ITEM_FTS, match_expression, search_tokens
 
+ITEM_SHORT_COLUMNS = schema_columns(Item, ItemReadShort)
+ITEM_READ_COLUMNS = schema_columns(Item, ItemRead)
+ITEM_EXPORT_COLUMNS = [Item.id, Item.owner_id, *schema_columns(Item, ItemBase), Item.version]
 
-def item_create(item_in: ItemCreate, session: Session) -> ItemCreate:
-    item = Item(**item_in.model_dump())
-    session.add(item)
+DEFAULT_PERCENTILES = [50.0, 90.0, 95.0, 99.0]
+
+# SQLITE_MAX_VARIABLE_NUMBER в сборках до 3.32 — держимся под ним на любой версии
+MAX_BOUND_PARAMS = 999
+# total_price_statement: WHEN ? THEN ? в CASE и ? в IN на каждый id плюс два нуля (ELSE и coalesce)
+TOTAL_PRICE_PARAMS_PER_ID = 3
+
+# временная таблица для больших списков (item_id, qty): JOIN вместо IN с тысячами параметров
+ITEM_QUANTITIES = Table(
+    "item_quantities",
+    MetaData(),
+    Column("item_id", Integer, primary_key=True),
+    Column("qty", Integer, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+
+def item_cache_key(item_id: int) -> str:
+    return f"item:{item_id}"
+
+
+def item_create_statement(item_in: ItemCreate) -> Insert:
+    # RETURNING отдаёт сохранённую строку тем же запросом, что её вставил
+    return insert(Item).values(**item_in.model_dump()).returning(*ITEM_READ_COLUMNS)
+
+
+def item_update_statement(item_id: int, item_in: ItemUpdate) -> Update:
+    # пустой результат — строки нет, отдельный SELECT перед UPDATE не нужен
+    return (
+        update(Item)
+        .where(Item.id == item_id)
+        .values(**item_in.model_dump(exclude_unset=True), version=Item.version + 1)
+        .returning(*ITEM_READ_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def item_delete_statement(item_id: int) -> Delete:
+    return delete(Item).where(Item.id == item_id).returning(Item.id).execution_options(synchronize_session=False)
+
+
+def item_create(item_in: ItemCreate, session: Session) -> ItemRead:
+    row = session.execute(item_create_statement(item_in)).one()
     session.commit()
-    session.refresh(item)
-    return item_in  # TODO return db item
+    return ItemRead.model_construct(**row._mapping)
+
+
+def items_create_bulk(rows: list[Any], session: Session) -> BulkResult:
+    return bulk_insert(session, Item, ItemCreate, rows)
+
+
+def items_update_bulk(rows: list[Any], session: Session) -> BulkResult:
+    result = bulk_update(session, Item, ItemBulkUpdate, rows)
+    cache.invalidate(*map(item_cache_key, result.ids))
+    return result
+
+
+def items_delete_bulk(item_ids: list[int], session: Session) -> BulkResult:
+    result = bulk_delete(session, Item, item_ids)
+    cache.invalidate(*map(item_cache_key, result.ids))
+    return result
 
 
-def item_read(item_id: int, session: Session) -> ItemRead | HTTPException:
-    item = session.get(Item, item_id)
-    if not item:
+def item_read(item_id: int, session: Session) -> ItemRead:
+    cached = cache.get(item_cache_key(item_id))
+    if cached is not MISSING:
+        return cached
+
+    row = session.exec(select(*ITEM_READ_COLUMNS).where(Item.id == item_id)).first()
+    if not row:
         msg = f"Item {item_id} is not found."
-        return HTTPException(status_code=404, detail=msg)
-    return ItemRead(**item.model_dump())
+        raise HTTPException(status_code=404, detail=msg)
+
+    # типы колонок совпадают со схемой — модель собирается без повторной валидации
+    item_out = ItemRead.model_construct(**row._mapping)
+    if is_primary(session):
+        cache.set(item_cache_key(item_id), item_out)
+    return item_out
+
+
+def items_warm_cache(session: Session, limit: int) -> int:
+    rows = session.exec(select(*ITEM_READ_COLUMNS).order_by(Item.id).limit(limit)).all()
+    for row in rows:
+        cache.set(item_cache_key(row.id), ItemRead.model_construct(**row._mapping))
+    return len(rows)
+
+
+def item_read_all(session: Session, limit: int = settings.page_size, after: int | None = None) -> ItemPage:
+    # keyset-пагинация: следующая страница начинается после последнего id предыдущей
+    statement = select(*ITEM_SHORT_COLUMNS).order_by(Item.id).limit(limit + 1)
+    if after is not None:
+        statement = statement.where(Item.id > after)
+
+    return item_page(session.exec(statement).all(), limit)
+
 
+def items_page_etag(session: Session, limit: int = settings.page_size, after: int | None = None) -> str:
+    return collection_etag(session.exec(page_fingerprint_statement(Item, limit, after)).one())
 
-def item_read_all(session: Session) -> list[ItemReadShort]:
-    items = session.exec(select(Item)).all()
-    return [ItemReadShort(**item.model_dump()) for item in items]
 
+def items_export_statement() -> Select:
+    return select(*ITEM_EXPORT_COLUMNS).order_by(Item.id)
 
-def item_delete(item_id: int, session: Session) -> HTTPException | str:
-    items = session.get(Item, item_id)
-    if not items:
+
+def item_page(rows: Sequence[Any], limit: int) -> ItemPage:
+    items = [ItemReadShort.model_construct(**row._mapping) for row in rows[:limit]]
+    next_cursor = items[-1].id if len(rows) > limit else None
+    return ItemPage.model_construct(items=items, next_cursor=next_cursor)
+
+
+def item_delete(item_id: int, session: Session) -> str:
+    if session.execute(item_delete_statement(item_id)).first() is None:
         msg = f"Item {item_id} is not found."
-        return HTTPException(status_code=404, detail=msg)
-    session.delete(items)
+        raise HTTPException(status_code=404, detail=msg)
     session.commit()
+    cache.invalidate(item_cache_key(item_id))
     return f"Предмет с id {item_id} удален"
 
 
-def item_update(item_id: int, item_in: ItemUpdate, session: Session) -> Item:
-    item: Item | None = session.get(Item, item_id)
-
-    if not item:
+def item_update(item_id: int, item_in: ItemUpdate, session: Session) -> ItemRead:
+    row = session.execute(item_update_statement(item_id, item_in)).first()
+    if row is None:
         msg = f"Item {item_id} is not found."
         raise HTTPException(status_code=404, detail=msg)
-
-    update_data = item_in.model_dump(exclude_unset=True)
-    item.sqlmodel_update(update_data)
-    session.add(item)
     session.commit()
-    session.refresh(item)
+    cache.invalidate(item_cache_key(item_id))
+    return ItemRead.model_construct(**row._mapping)
 
-    return item
 
+def items_by_owner_statement(owner_id: int) -> Select:
+    # только колонки ItemRead, без ORM-сущностей в identity map
+    return select(*ITEM_READ_COLUMNS).where(Item.owner_id == owner_id).order_by(Item.id)
 
-def items_filter_by_owner_id(owner_id: int, session: Session) -> Sequence[Any]:
-    statement = select(Item).where(Item.owner_id == owner_id)
 
-    items = session.exec(statement).all()
-
-    if not items:
+def owner_items(rows: Sequence[Any], owner_id: int) -> list[ItemRead]:
+    if not rows:
         raise HTTPException(status_code=404, detail=f"No items found for owner {owner_id}")
+    return [ItemRead.model_construct(**row._mapping) for row in rows]
+
+
+def items_filter_by_owner_id(owner_id: int, session: Session) -> list[ItemRead]:
+    return owner_items(session.exec(items_by_owner_statement(owner_id)).all(), owner_id)
+
+
+def item_quantities(lines: list[int | ItemQuantity]) -> Counter[int]:
+    # голый id — одна штука, повторы одного товара складываются
+    quantities: Counter[int] = Counter()
+    for line in lines:
+        if isinstance(line, int):
+            quantities[line] += 1
+        else:
+            quantities[line.item_id] += line.qty
+    return quantities
+
+
+def total_price_statement(quantities: Counter[int]) -> Select:
+    # небольшой список — одним запросом, количество подставляется через CASE по id
+    total = func.sum(Item.price * case(quantities, value=Item.id, else_=0))
+    return select(func.coalesce(total, 0)).where(Item.id.in_(quantities))
+
+
+def total_price_fits_inline(quantities: Counter[int]) -> bool:
+    return len(quantities) * TOTAL_PRICE_PARAMS_PER_ID + 2 <= MAX_BOUND_PARAMS
+
+
+def total_price_joined_statement() -> Select:
+    total = func.sum(Item.price * ITEM_QUANTITIES.c.qty)
+    return select(func.coalesce(total, 0)).select_from(ITEM_QUANTITIES).join(Item, Item.id == ITEM_QUANTITIES.c.item_id)
+
+
+def quantity_rows(quantities: Counter[int]) -> list[dict[str, int]]:
+    return [{"item_id": item_id, "qty": qty} for item_id, qty in quantities.items()]
+
+
+def item_calculate_total_price(lines: list[int | ItemQuantity], session: Session) -> float:
+    quantities = item_quantities(lines)
+    if not quantities:
+        # CASE без единой ветки WHEN — синтаксическая ошибка, в базу не ходим
+        return 0.0
+    if total_price_fits_inline(quantities):
+        return float(session.execute(total_price_statement(quantities)).scalar_one())
+
+    session.execute(CreateTable(ITEM_QUANTITIES, if_not_exists=True))
+    try:
+        session.execute(insert(ITEM_QUANTITIES), quantity_rows(quantities))
+        return float(session.execute(total_price_joined_statement()).scalar_one())
+    finally:
+        # строки временной таблицы не переживают откат — соединение вернётся в пул с пустой таблицей
+        session.rollback()
+
+
+def inventory_value_statement(limit: int, after: int | None) -> Select:
+    statement = (
+        select(
+            Item.owner_id,
+            func.count(Item.id).label("items"),
+            func.sum(Item.quantity_in_stock).label("units"),
+            func.sum(Item.price * Item.quantity_in_stock).label("value"),
+        )
+        .where(Item.owner_id.is_not(None))
+        .group_by(Item.owner_id)
+        .order_by(Item.owner_id)
+        .limit(limit + 1)
+    )
+    if after is not None:
+        statement = statement.where(Item.owner_id > after)
+    return statement
+
+
+def inventory_value_page(rows: Sequence[Any], limit: int) -> OwnerInventoryPage:
+    owners = [OwnerInventory.model_construct(**row._mapping) for row in rows[:limit]]
+    next_cursor = owners[-1].owner_id if len(rows) > limit else None
+    return OwnerInventoryPage.model_construct(owners=owners, next_cursor=next_cursor)
+
+
+def items_inventory_value(
+    session: Session, limit: int = settings.page_size, after: int | None = None
+) -> OwnerInventoryPage:
+    rows = session.execute(inventory_value_statement(limit, after)).all()
+    return inventory_value_page(rows, limit)
+
+
+def nearest_rank(percentile: float, count: int) -> int:
+    return max(1, math.ceil(percentile / 100 * count))
+
+
+def prices_at_ranks_statement(ranks: set[int]) -> Select:
+    # один проход по цене на все перцентили; в Python приходят только строки с нужными номерами
+    ranked = select(Item.price, func.row_number().over(order_by=Item.price).label("rank")).subquery()
+    return select(ranked.c.rank, ranked.c.price).where(ranked.c.rank.in_(ranks))
+
+
+def price_percentiles(percentiles: list[float], count: int, prices: dict[int, int]) -> PricePercentiles:
+    values = {f"{percentile:g}": prices.get(nearest_rank(percentile, count)) for percentile in percentiles}
+    return PricePercentiles(count=count, percentiles=values)
+
+
+def items_price_percentiles(percentiles: list[float], session: Session) -> PricePercentiles:
+    count = session.exec(select(func.count(Item.id))).one()
+    prices: dict[int, int] = {}
+    if count and percentiles:
+        ranks = {nearest_rank(percentile, count) for percentile in percentiles}
+        prices = dict(session.execute(prices_at_ranks_statement(ranks)).tuples().all())
+    return price_percentiles(percentiles, count, prices)
+
+
+def stock_split_statement() -> Select:
+    return select(
+        Item.adult_product,
+        func.count(Item.id),
+        func.coalesce(func.sum(Item.quantity_in_stock), 0),
+        func.coalesce(func.sum(Item.price * Item.quantity_in_stock), 0),
+    ).group_by(Item.adult_product)
+
+
+def stock_split(rows: Sequence[Any]) -> StockSplit:
+    totals = {
+        bool(adult_product): StockTotals(items=items, units=units, value=value)
+        for adult_product, items, units, value in rows
+    }
+    return StockSplit(adult=totals.get(True, StockTotals()), non_adult=totals.get(False, StockTotals()))
+
+
+def items_stock_split(session: Session) -> StockSplit:
+    return stock_split(session.execute(stock_split_statement()).all())
 
-    return items
 
+def items_search_statement(filters: ItemSearch, dialect: str) -> Select:
+    statement = select(*ITEM_SHORT_COLUMNS)
+    key = Item.id
+    if tokens := search_tokens(filters.q or ""):
+        if dialect == "sqlite":
+            # сортировка и курсор по rowid индекса: FTS5 отдаёт совпадения сразу в этом порядке
+            key = ITEM_FTS.c.rowid
+            statement = statement.join(ITEM_FTS, ITEM_FTS.c.rowid == Item.id).where(match_expression(tokens))
+        else:
+            # без FTS-индекса: каждое слово должно встретиться в названии или описании
+            statement = statement.where(
+                *(
+                    or_(Item.name.icontains(token, autoescape=True), Item.description.icontains(token, autoescape=True))
+                    for token in tokens
+                ),
+            )
+    if filters.min_price is not None:
+        statement = statement.where(Item.price >= filters.min_price)
+    if filters.max_price is not None:
+        statement = statement.where(Item.price <= filters.max_price)
+    if filters.adult_product is not None:
+        statement = statement.where(Item.adult_product == filters.adult_product)
+    if filters.after is not None:
+        statement = statement.where(key > filters.after)
+    return statement.order_by(key).limit(filters.limit + 1)
 
-def item_calculate_total_price(ids: list[int], session: Session) -> float:
-    statement = select(func.sum(Item.price)).where(Item.id.in_(ids))
-    total = session.exec(statement).one()
 
-    return total or 0.0
+def items_search(filters: ItemSearch, session: Session) -> ItemPage:
+    statement = items_search_statement(filters, session.bind.dialect.name)
+    return item_page(session.exec(statement).all(), filters.limit)
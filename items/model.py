@@ -1,17 +1,26 @@
+from typing import Annotated
+
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
+from core.config import settings
+from core.model import Versioned
+
 
 class ItemBase(SQLModel):
-    name: str
+    name: str = Field(index=True)
     description: str
-    price: int
+    price: int = Field(index=True)
     quantity_in_stock: int
     adult_product: bool
 
 
-class Item(ItemBase, table=True):
+class Item(ItemBase, Versioned, table=True):
+    # фильтр поиска по adult_product вместе с диапазоном цены
+    __table_args__ = (Index("ix_item_adult_product_price", "adult_product", "price"),)
+
     id: int | None = Field(default=None, primary_key=True)
-    owner_id: int | None = None
+    owner_id: int | None = Field(default=None, index=True)
 
 
 class ItemCreate(ItemBase):
@@ -27,6 +36,10 @@ class ItemUpdate(SQLModel):
     # adult_product we don't want change this
 
 
+class ItemBulkUpdate(ItemUpdate):
+    id: int
+
+
 class ItemReadShort(SQLModel):
     id: int
     name: str
@@ -34,5 +47,57 @@ class ItemReadShort(SQLModel):
     adult_product: bool
 
 
+class ItemPage(SQLModel):
+    items: list[ItemReadShort]
+    next_cursor: int | None = None
+
+
 class ItemRead(ItemBase):
     id: int
+    owner_id: int | None = None
+    version: int
+
+
+class ItemSearch(SQLModel):
+    q: str | None = Field(default=None, max_length=200)
+    min_price: int | None = Field(default=None, ge=0)
+    max_price: int | None = Field(default=None, ge=0)
+    adult_product: bool | None = None
+    limit: int = Field(default=settings.page_size, ge=1, le=settings.max_page_size)
+    after: int | None = None
+
+
+class ItemQuantity(SQLModel):
+    item_id: int
+    qty: int = Field(default=1, ge=1)
+
+
+class OwnerInventory(SQLModel):
+    owner_id: int
+    items: int
+    units: int
+    value: int
+
+
+class OwnerInventoryPage(SQLModel):
+    owners: list[OwnerInventory]
+    next_cursor: int | None = None
+
+
+class StockTotals(SQLModel):
+    items: int = 0
+    units: int = 0
+    value: int = 0
+
+
+class StockSplit(SQLModel):
+    adult: StockTotals
+    non_adult: StockTotals
+
+
+Percentile = Annotated[float, Field(gt=0, le=100)]
+
+
+class PricePercentiles(SQLModel):
+    count: int
+    percentiles: dict[str, int | None]
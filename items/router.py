@@ -1,44 +1,112 @@
-from collections.abc import Sequence
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from starlette import status
 
-from core.database import SessionDep
+from core.bulk import BulkResult
+from core.config import settings
+from core.database import ReadSessionDep, SessionDep
+from core.etag import conditional, resource_etag
+from core.export import ExportFormat, export_chunks, export_response
+from core.profiler import ProfiledRoute
 from items.crud import (
+    DEFAULT_PERCENTILES,
     item_calculate_total_price,
     item_create,
     item_delete,
     item_read,
     item_read_all,
     item_update,
+    items_create_bulk,
+    items_delete_bulk,
+    items_export_statement,
     items_filter_by_owner_id,
+    items_inventory_value,
+    items_page_etag,
+    items_price_percentiles,
+    items_search,
+    items_stock_split,
+    items_update_bulk,
 )
 from items.model import (
-    Item,
-    ItemBase,
     ItemCreate,
+    ItemPage,
+    ItemQuantity,
     ItemRead,
-    ItemReadShort,
+    ItemSearch,
     ItemUpdate,
+    OwnerInventoryPage,
+    Percentile,
+    PricePercentiles,
+    StockSplit,
 )
 
-router = APIRouter(prefix="/items", tags=["items"])
+router = APIRouter(prefix="/items", tags=["items"], route_class=ProfiledRoute)
+
+
+# bulk-роуты объявлены раньше /{item_id}, иначе "bulk" попадёт в item_id
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+def create_items_bulk(rows: list[Any], session: SessionDep) -> BulkResult:
+    """
+    строки в формате ItemCreate: каждая валидируется отдельно, невалидные попадают в errors со своим индексом.
+    """
+    return items_create_bulk(rows, session)
+
+
+@router.patch("/bulk", status_code=status.HTTP_200_OK)
+def update_items_bulk(rows: list[Any], session: SessionDep) -> BulkResult:
+    """
+    строки в формате ItemBulkUpdate: каждая валидируется отдельно, невалидные попадают в errors со своим индексом.
+    """
+    return items_update_bulk(rows, session)
+
+
+@router.delete("/bulk", status_code=status.HTTP_200_OK)
+def delete_items_bulk(item_ids: list[int], session: SessionDep) -> BulkResult:
+    return items_delete_bulk(item_ids, session)
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+def export_items(
+    *, export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson", gzip: bool = False
+) -> StreamingResponse:
+    """
+    потоковая выгрузка всех товаров в NDJSON или CSV, gzip=true сжимает поток.
+    """
+    chunks = export_chunks(items_export_statement(), export_format, gzip=gzip)
+    return export_response(chunks, "items", export_format, gzip=gzip)
+
+
+@router.get("/search", status_code=status.HTTP_200_OK)
+def search_items(filters: Annotated[ItemSearch, Query()], session: SessionDep) -> ItemPage:
+    """
+    поиск по словам в названии/описании, диапазону цены и adult_product.
+    """
+    return items_search(filters, session)
 
 
 @router.get("/{item_id}", status_code=status.HTTP_200_OK)
-def get_item(item_id: int, session: SessionDep) -> ItemRead:
-    return item_read(item_id, session)
+def get_item(item_id: int, session: ReadSessionDep, request: Request, response: Response) -> ItemRead:
+    item = item_read(item_id, session)
+    return conditional(request, response, resource_etag(item.id, item.version)) or item
 
 
 @router.post("/{item_id}", status_code=status.HTTP_202_ACCEPTED)
-def create_item(item_in: ItemCreate, session: SessionDep) -> ItemBase:
+def create_item(item_in: ItemCreate, session: SessionDep) -> ItemRead:
     return item_create(item_in, session)
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
-def read_all_items(session: SessionDep) -> list[ItemReadShort]:
-    return item_read_all(session)
+def read_all_items(
+    request: Request,
+    response: Response,
+    session: ReadSessionDep,
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = settings.page_size,
+    after: int | None = None,
+) -> ItemPage:
+    etag = items_page_etag(session, limit, after)
+    return conditional(request, response, etag) or item_read_all(session, limit, after)
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_200_OK)
@@ -47,15 +115,48 @@ def delete_item(item_id: int, session: SessionDep) -> str:
 
 
 @router.patch("/{item_id}", status_code=status.HTTP_200_OK)
-def update_item(item_id: int, item_in: ItemUpdate, session: SessionDep) -> Item:
+def update_item(item_id: int, item_in: ItemUpdate, session: SessionDep) -> ItemRead:
     return item_update(item_id, item_in, session)
 
 
 @router.get("/get_by_owner/{owner_id}", status_code=status.HTTP_200_OK)
-def get_items_by_owner(owner_id: int, session: SessionDep) -> Sequence[Any]:
+def get_items_by_owner(owner_id: int, session: SessionDep) -> list[ItemRead]:
     return items_filter_by_owner_id(owner_id, session)
 
 
 @router.post("/calculate-total/", status_code=status.HTTP_202_ACCEPTED)
-def item_calculate_total(item_ids: list[int], session: SessionDep) -> float:
-    return item_calculate_total_price(item_ids, session)
+def item_calculate_total(items: list[int | ItemQuantity], session: SessionDep) -> float:
+    """
+    сумма по списку товаров: id (одна штука) или {"item_id": ..., "qty": ...}.
+    """
+    return item_calculate_total_price(items, session)
+
+
+@router.get("/stats/inventory-value", status_code=status.HTTP_200_OK)
+def get_inventory_value(
+    session: SessionDep,
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = settings.page_size,
+    after: int | None = None,
+) -> OwnerInventoryPage:
+    """
+    стоимость товаров на складе (цена * остаток) по владельцам.
+    """
+    return items_inventory_value(session, limit, after)
+
+
+@router.get("/stats/price-percentiles", status_code=status.HTTP_200_OK)
+def get_price_percentiles(
+    session: SessionDep, p: Annotated[list[Percentile] | None, Query()] = None
+) -> PricePercentiles:
+    """
+    перцентили цены (nearest rank), по умолчанию 50/90/95/99.
+    """
+    return items_price_percentiles(p or DEFAULT_PERCENTILES, session)
+
+
+@router.get("/stats/stock", status_code=status.HTTP_200_OK)
+def get_stock_split(session: SessionDep) -> StockSplit:
+    """
+    остатки и их стоимость отдельно для товаров 18+ и остальных.
+    """
+    return items_stock_split(session)
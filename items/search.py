@@ -0,0 +1,62 @@
+"""Полнотекстовый индекс по name/description товаров (SQLite FTS5).
+
+item_fts — external content таблица: текст хранится только в item, индекс синхронизируют триггеры,
+поэтому в него попадают и bulk-вставки, и сидирование, и правки в обход ORM.
+На других бэкендах индекса нет — поиск идёт через ILIKE.
+"""
+
+import logging
+import re
+
+from sqlalchemy import Column, Connection, Integer, MetaData, Table, Text, literal_column
+
+logger = logging.getLogger(__name__)
+
+ITEM_FTS = Table(
+    "item_fts",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("name", Text),
+    Column("description", Text),
+)
+
+ITEM_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS item_fts USING fts5("
+    "name, description, content='item', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS item_fts_insert AFTER INSERT ON item BEGIN "
+    "INSERT INTO item_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS item_fts_delete AFTER DELETE ON item BEGIN "
+    "INSERT INTO item_fts(item_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    "END",
+    # остатки и цены меняются часто — индекс трогаем, только когда меняется текст
+    "CREATE TRIGGER IF NOT EXISTS item_fts_update AFTER UPDATE OF name, description ON item BEGIN "
+    "INSERT INTO item_fts(item_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO item_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+)
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def create_item_search_index(connection: Connection):
+    if connection.dialect.name != "sqlite":
+        return
+
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'item_fts'",
+    ).first()
+    for statement in ITEM_FTS_DDL:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        # индекс появился поверх уже заполненной таблицы — строим его по текущим строкам
+        connection.exec_driver_sql("INSERT INTO item_fts(item_fts) VALUES ('rebuild')")
+        logger.info("Полнотекстовый индекс item_fts построен")
+
+
+def search_tokens(query: str) -> list[str]:
+    return TOKEN_RE.findall(query)
+
+
+def match_expression(tokens: list[str]):
+    # каждое слово в кавычках: операторы FTS5 (AND, NEAR, "*", ":") из запроса пользователя не работают
+    phrase = " ".join(f'"{token}"' for token in tokens)
+    return literal_column(ITEM_FTS.name).op("MATCH")(phrase)
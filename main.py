@@ -1,17 +1,93 @@
-import uvicorn
-from fastapi import FastAPI
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import ExitStack, asynccontextmanager, contextmanager
 
-from core.database import create_db_and_tables, load_data_from_json
-from items.router import router as items_router
-from users.router import router as users_router
+# фаза старта -> длительность в мс
+startup_timings: dict[str, float] = {}
 
-app = FastAPI()
 
+@contextmanager
+def startup_phase(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = (time.perf_counter() - started) * 1000
 
-@app.on_event("startup")
-def on_startup():
-    create_db_and_tables()
-    load_data_from_json("data.json")
+
+# импорт FastAPI, SQLAlchemy, движков, моделей и роутов — до блока замер не начинается, поэтому он первый
+with startup_phase("imports"):
+    import uvicorn
+    from fastapi import APIRouter, FastAPI
+    from fastapi.responses import ORJSONResponse
+    from sqlmodel import Session
+
+    from core.config import settings
+    from core.database import async_engine, async_replicas, create_db_and_tables, engine, seed_from_json
+    from core.health import router as health_router
+    from core.metrics import MetricsMiddleware
+    from core.metrics import router as metrics_router
+    from core.profiler import ProfilerMiddleware
+    from core.replicas import ReadYourWritesMiddleware
+    from core.router import router as core_router
+    from core.startup import async_warm_pool, startup_lock, warm_pool
+    from items.crud import items_warm_cache
+    from items.router import router as items_router
+    from users.crud import users_warm_cache
+    from users.purchase_queue import purchase_queue
+    from users.router import router as users_router
+
+logging.basicConfig(level=settings.log_level)
+logger = logging.getLogger(__name__)
+
+
+async def warm_up():
+    # соединения пула открыты заранее, а самые первые записи уже в кэше — первые запросы не платят за холодный старт
+    warm_pool(engine, settings.pool_size)
+    if async_engine is not None:
+        await async_warm_pool(async_engine, settings.pool_size)
+    with Session(engine) as session:
+        items_warm_cache(session, settings.warmup_cache_rows)
+        users_warm_cache(session, settings.warmup_cache_rows)
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    application.state.ready = False
+    # схему и seed воркеры проходят по одному
+    with ExitStack() as stack:
+        with startup_phase("lock"):
+            stack.enter_context(startup_lock(settings.startup_lock_path))
+        with startup_phase("metadata"):
+            create_db_and_tables()
+        with startup_phase("seed"):
+            seed_from_json("data.json")
+    with startup_phase("warmup"):
+        await warm_up()
+    if settings.purchase_queue_enabled:
+        purchase_queue.start()
+    application.state.ready = True
+    logger.info("Startup: %s", ", ".join(f"{phase} {ms:.1f} ms" for phase, ms in startup_timings.items()))
+
+    yield
+
+    application.state.ready = False
+    # очередь покупок дописывает принятые покупки до закрытия пулов
+    purchase_queue.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in async_replicas.engines:
+        await replica.dispose()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+# добавленный последним — внешний: профилировщик видит счётчик запросов из MetricsMiddleware
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+if settings.replica_urls:
+    # после записи клиент какое-то время читает с основного, а не с отстающей реплики
+    app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=settings.replica_sticky_seconds)
 
 
 @app.get("/")
@@ -19,9 +95,37 @@ def read_root():
     return {"Hello World"}
 
 
-app.include_router(items_router)
-app.include_router(users_router)
+def include_routers(application: FastAPI, routers: list[APIRouter], overrides: list[APIRouter]):
+    # Маршрут из overrides (тот же путь и метод) встаёт на место синхронного — порядок маршрутов сохраняется
+    replacements = {(route.path, frozenset(route.methods)): route for router in overrides for route in router.routes}
+    for router in routers:
+        merged = APIRouter()
+        merged.routes.extend(replacements.get((route.path, frozenset(route.methods)), route) for route in router.routes)
+        application.include_router(merged)
+
+
+def async_routers() -> list[APIRouter]:
+    # async-роуты нужны только в async-режиме — в обычном их модули не импортируем
+    if not settings.async_mode:
+        return []
+
+    from items.async_router import router as items_async_router  # noqa: PLC0415
+    from users.async_router import router as users_async_router  # noqa: PLC0415
+
+    return [items_async_router, users_async_router]
+
+
+# в async-режиме сюда же входит импорт async-роутов
+with startup_phase("routers"):
+    app.include_router(health_router)
+    if settings.debug_endpoints:
+        app.include_router(core_router)
+    app.include_router(metrics_router)
+
+    # В async-режиме async-роуты заменяют синхронные, остальные работают как раньше
+    include_routers(app, [items_router, users_router], async_routers())
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)  # noqa: S104
+    # несколько воркеров uvicorn запускает только по строке импорта приложения
+    uvicorn.run("main:app", host=settings.host, port=settings.port, workers=settings.workers)
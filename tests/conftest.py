@@ -0,0 +1,62 @@
+import os
+import tempfile
+import uuid
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# настройки читаются при импорте core.config — окружение выставляем до импорта приложения
+ROOT = Path(__file__).resolve().parent.parent
+TMP_DIR = Path(tempfile.mkdtemp(prefix="fastapi-learning-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR / 'test.db'}"
+os.environ["STARTUP_LOCK_PATH"] = str(TMP_DIR / "startup.lock")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.chdir(ROOT)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_item(client: TestClient) -> Callable[..., dict[str, Any]]:
+    def create(**fields: Any) -> dict[str, Any]:
+        payload = {
+            "name": f"item {uuid.uuid4().hex[:8]}",
+            "description": "test item",
+            "price": 10,
+            "quantity_in_stock": 10,
+            "adult_product": False,
+        } | fields
+        response = client.post("/items/0", json=payload)
+        assert response.status_code == 202, response.text
+        return response.json()
+
+    return create
+
+
+@pytest.fixture
+def make_user(client: TestClient) -> Callable[..., dict[str, Any]]:
+    def create(**fields: Any) -> dict[str, Any]:
+        payload = {
+            "first_name": "Test",
+            "last_name": "User",
+            "email": f"{uuid.uuid4().hex[:12]}@example.com",
+            "age": 30,
+            "password": "password",
+            "sex": "Male",
+            "balance": 1000,
+        } | fields
+        response = client.post("/users/", json=payload)
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return create
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.config import settings
+from core.database import create_tuned_async_engine, to_async_url
+from items import async_crud
+from items.model import ItemCreate, ItemUpdate
+from main import include_routers
+
+
+def test_async_url_keeps_credentials_and_unknown_backends():
+    assert to_async_url("sqlite:///data.db") == "sqlite+aiosqlite:///data.db"
+    assert to_async_url("postgres://user:secret@db/shop") == "postgresql+asyncpg://user:secret@db/shop"
+    assert to_async_url("mysql://user@db/shop") == "mysql://user@db/shop"
+
+
+def test_async_routes_replace_sync_ones_in_place():
+    sync_router, async_router = APIRouter(), APIRouter()
+    for path in ("/a", "/b"):
+        sync_router.add_api_route(path, lambda: "sync")
+    async_router.add_api_route("/a", lambda: "async")
+    application = FastAPI()
+
+    include_routers(application, [sync_router], [async_router])
+
+    routes = [(route.path, route.endpoint()) for route in application.routes if route.path in {"/a", "/b"}]
+    assert routes == [("/a", "async"), ("/b", "sync")]
+
+
+@pytest.mark.usefixtures("client")
+def test_async_crud_round_trip():
+    item_in = ItemCreate(name="async item", description="test item", price=5, quantity_in_stock=1, adult_product=False)
+
+    async def round_trip():
+        async_engine = create_tuned_async_engine(to_async_url(settings.database_url))
+        try:
+            async with AsyncSession(async_engine) as session:
+                created = await async_crud.item_create(item_in, session)
+                await async_crud.item_update(created.id, ItemUpdate(price=6), session)
+                return created, await async_crud.item_read(created.id, session)
+        finally:
+            await async_engine.dispose()
+
+    created, read = asyncio.run(round_trip())
+
+    assert read.id == created.id
+    assert (read.price, read.version) == (6, created.version + 1)
@@ -0,0 +1,34 @@
+from bench.routes import SCENARIOS, regressions
+from items.router import router as items_router
+from users.router import router as users_router
+
+
+def bench_result(p95_ms: float, throughput: float) -> dict:
+    return {"p95_ms": p95_ms, "throughput": throughput}
+
+
+def test_every_route_has_a_bench_scenario():
+    routes = {
+        (method, route.path) for route in [*items_router.routes, *users_router.routes] for method in route.methods
+    }
+
+    assert routes - set(SCENARIOS) == set()
+
+
+def test_regressions_compare_against_baseline_thresholds():
+    baseline = {
+        "thresholds": {"p95_increase": 0.2, "throughput_drop": 0.2},
+        "routes": {"GET /a": bench_result(10, 100), "GET /b": bench_result(10, 100), "GET /c": bench_result(10, 100)},
+    }
+    current = {
+        "routes": {
+            "GET /a": bench_result(12, 80),  # ровно на порогах
+            "GET /b": bench_result(12.5, 79),
+            "GET /new": bench_result(1000, 1),  # в базовом прогоне роута нет
+        },
+    }
+
+    assert regressions(current, baseline) == [
+        "GET /b: p95 10 -> 12.5 ms",
+        "GET /b: throughput 100 -> 79 req/s",
+    ]
@@ -0,0 +1,52 @@
+from starlette import status
+
+ITEM = {"name": "bulk item", "description": "test item", "price": 10, "quantity_in_stock": 5, "adult_product": False}
+MISSING_ID = 10**9
+
+
+def test_bulk_create_reports_invalid_rows_by_index(client):
+    rows = [ITEM, ITEM | {"price": "cheap"}, "not an object", ITEM | {"name": "second"}]
+
+    response = client.post("/items/bulk", json=rows)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    result = response.json()
+    assert result["processed"] == 2
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+    assert "price" in result["errors"][0]["detail"]
+    names = [client.get(f"/items/{item_id}").json()["name"] for item_id in result["ids"]]
+    assert names == ["bulk item", "second"]
+
+
+def test_bulk_update_reports_invalid_rows_by_index(client, make_item):
+    first = make_item(price=10)
+    second = make_item(price=20)
+    rows = [
+        {"id": first["id"], "price": 11},
+        {"id": second["id"], "price": "expensive"},
+        {"price": 12},
+        {"id": MISSING_ID, "price": 13},
+    ]
+
+    response = client.patch("/items/bulk", json=rows)
+
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["ids"] == [first["id"]]
+    assert [(error["index"], error["id"]) for error in result["errors"]] == [
+        (1, second["id"]),
+        (2, None),
+        (3, MISSING_ID),
+    ]
+    assert client.get(f"/items/{first['id']}").json()["price"] == 11
+    assert client.get(f"/items/{second['id']}").json()["price"] == 20
+
+
+def test_bulk_create_users_validates_each_row(client):
+    user = {"first_name": "Bulk", "last_name": "User", "age": 30, "sex": "Male", "balance": 10}
+    rows = [user | {"email": "bulk-valid@example.com"}, user | {"email": "not an email"}]
+
+    result = client.post("/users/bulk", json=rows).json()
+
+    assert result["processed"] == 1
+    assert [error["index"] for error in result["errors"]] == [1]
@@ -0,0 +1,51 @@
+from sqlalchemy import update
+
+from core.cache import MISSING, LRUCache
+from core.database import engine
+from items.model import Item
+from users.model import User
+
+
+def change_behind_api(statement):
+    # запись в обход CRUD: кэш о ней не знает
+    with engine.begin() as connection:
+        connection.execute(statement)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+
+    lru.set("c", 3)
+
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, MISSING, 3)
+    assert lru.stats().evictions == 1
+
+
+def test_item_read_is_cached_until_api_write(client, make_item):
+    item = make_item(price=10)
+    path = f"/items/{item['id']}"
+    client.get(path)
+
+    change_behind_api(update(Item).where(Item.id == item["id"]).values(price=20))
+    assert client.get(path).json()["price"] == 10
+
+    client.patch(path, json={"quantity_in_stock": 3})
+    fresh = client.get(path).json()
+    assert (fresh["price"], fresh["quantity_in_stock"]) == (20, 3)
+
+
+def test_user_read_is_invalidated_by_purchase(client, make_user, make_item):
+    user = make_user(balance=100)
+    item = make_item(price=30)
+    path = f"/users/{user['id']}"
+    client.get(path)
+
+    change_behind_api(update(User).where(User.id == user["id"]).values(first_name="Stale"))
+    assert client.get(path).json()["first_name"] == "Test"
+
+    client.post(f"{path}/items", params={"item_id": item["id"]})
+    fresh = client.get(path).json()
+    assert (fresh["first_name"], fresh["balance"]) == ("Stale", 70)
@@ -0,0 +1,132 @@
+import pytest
+from sqlalchemy import insert, select
+from starlette import status
+
+from core.database import engine
+from users.crud import cart_item_add_statement
+from users.migrations import migrate_cart_item_ids
+from users.model import CartItem, UserCartRead
+
+
+def cart_path(user: dict) -> str:
+    return f"/users/{user['id']}/cart"
+
+
+def test_add_and_remove_cart_lines(client, make_user, make_item):
+    user = make_user()
+    first, second = make_item(), make_item()
+
+    assert client.post(f"{cart_path(user)}/items/{first['id']}", params={"qty": 2}).json() == {
+        "item_id": first["id"],
+        "qty": 2,
+    }
+    client.post(f"{cart_path(user)}/items/{first['id']}")
+    client.post(f"{cart_path(user)}/items/{second['id']}")
+    client.delete(f"{cart_path(user)}/items/{second['id']}")
+
+    assert client.get(cart_path(user)).json()["items"] == [{"item_id": first["id"], "qty": 3}]
+
+
+def test_adding_missing_item_is_rejected(client, make_user):
+    user = make_user()
+
+    response = client.post(f"{cart_path(user)}/items/{10**9}")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_cart_with_missing_items_is_not_created(client, make_user, make_item):
+    user = make_user()
+    item = make_item()
+
+    response = client.post(cart_path(user), json={"user_id": user["id"], "item_ids": [item["id"], 10**9]})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert str(10**9) in response.json()["detail"]
+    assert client.get(cart_path(user)).status_code == status.HTTP_404_NOT_FOUND
+
+    created = client.post(cart_path(user), json={"user_id": user["id"], "item_ids": [item["id"], item["id"]]})
+
+    assert created.status_code == status.HTTP_201_CREATED
+    assert created.json()["items"] == [{"item_id": item["id"], "qty": 2}]
+
+
+def test_cart_upsert_rejects_unsupported_dialect():
+    with pytest.raises(NotImplementedError, match="mysql"):
+        cart_item_add_statement(1, 1, 1, "mysql")
+
+
+def test_checkout_charges_quantities_and_removes_cart(client, make_user, make_item):
+    user = make_user(balance=100)
+    first = make_item(price=10, quantity_in_stock=5)
+    second = make_item(price=7, quantity_in_stock=5)
+    client.post(f"{cart_path(user)}/items/{first['id']}", params={"qty": 3})
+    client.post(f"{cart_path(user)}/items/{second['id']}")
+
+    response = client.post(f"{cart_path(user)}/buy")
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert client.get(f"/users/{user['id']}").json()["balance"] == 63
+    assert client.get(f"/items/{first['id']}").json()["quantity_in_stock"] == 2
+    assert client.get(f"/items/{second['id']}").json()["quantity_in_stock"] == 4
+    assert client.get(cart_path(user)).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_checkout_without_enough_stock_changes_nothing(client, make_user, make_item):
+    user = make_user(balance=100)
+    item = make_item(price=10, quantity_in_stock=1)
+    client.post(f"{cart_path(user)}/items/{item['id']}", params={"qty": 2})
+
+    assert client.post(f"{cart_path(user)}/buy").status_code == status.HTTP_400_BAD_REQUEST
+
+    assert client.get(f"/users/{user['id']}").json()["balance"] == 100
+    assert client.get(f"/items/{item['id']}").json()["quantity_in_stock"] == 1
+    assert client.get(cart_path(user)).json()["items"] == [{"item_id": item["id"], "qty": 2}]
+
+
+def test_legacy_item_ids_move_to_cart_lines(make_user, make_item):
+    user = make_user()
+    first, second = make_item(), make_item()
+    with engine.begin() as connection:
+        cart_id = connection.execute(
+            insert(UserCartRead)
+            .values(user_id=user["id"], item_ids=[first["id"], second["id"], first["id"]])
+            .returning(UserCartRead.id),
+        ).scalar_one()
+
+        migrate_cart_item_ids(connection)
+        # повторный запуск ничего не переносит второй раз
+        migrate_cart_item_ids(connection)
+
+        lines = connection.execute(
+            select(CartItem.item_id, CartItem.qty).where(CartItem.cart_id == cart_id).order_by(CartItem.item_id),
+        ).all()
+        item_ids = connection.execute(select(UserCartRead.item_ids).where(UserCartRead.id == cart_id)).scalar_one()
+
+    assert [tuple(line) for line in lines] == [(first["id"], 2), (second["id"], 1)]
+    assert item_ids is None
+
+
+def test_batch_checkout_settles_each_cart_on_its_own(client, make_user, make_item):
+    item = make_item(price=10, quantity_in_stock=5)
+    adult_item = make_item(price=1, adult_product=True)
+    buyer, poor, minor, without_cart = make_user(balance=100), make_user(balance=5), make_user(age=16), make_user()
+    for user, cart_item in ((buyer, item), (poor, item), (minor, adult_item)):
+        client.post(f"{cart_path(user)}/items/{cart_item['id']}", params={"qty": 2})
+    user_ids = [buyer["id"], poor["id"], minor["id"], without_cart["id"], buyer["id"]]
+
+    response = client.post("/users/carts/checkout", json=user_ids)
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    results = response.json()
+    # повтор id оплачивается один раз
+    assert [(result["user_id"], result["ok"]) for result in results] == [
+        (buyer["id"], True),
+        (poor["id"], False),
+        (minor["id"], False),
+        (without_cart["id"], False),
+    ]
+    assert results[0]["new_balance"] == 80
+    assert client.get(f"/items/{item['id']}").json()["quantity_in_stock"] == 3
+    assert client.get(f"/users/{poor['id']}").json()["balance"] == 5
+    assert client.get(cart_path(poor)).json()["items"] == [{"item_id": item["id"], "qty": 2}]
@@ -0,0 +1,42 @@
+import logging
+
+import pytest
+from sqlmodel import select
+
+from core.config import settings
+from core.database import engine
+from core.profiler import profiles
+from items.model import Item
+
+
+@pytest.mark.parametrize("path", ["/debug/pool", "/debug/cache", "/debug/profiles"])
+def test_debug_endpoints_are_off_by_default(client, path):
+    assert client.get(path).status_code == 404
+
+
+def test_profile_header_is_ignored_by_default(client, make_item):
+    item = make_item()
+    before = len(profiles.list())
+
+    assert client.get(f"/items/{item['id']}", headers={"X-Profile": "1"}).status_code == 200
+
+    assert len(profiles.list()) == before
+
+
+def test_health_stays_public(client):
+    assert client.get("/health").json() == {"status": "ok"}
+    assert client.get("/ready").json() == {"status": "ready"}
+
+
+@pytest.mark.usefixtures("client")
+def test_slow_query_is_logged_with_its_plan(monkeypatch, caplog):
+    # любой запрос медленнее порога
+    monkeypatch.setattr(settings, "slow_query_ms", 1e-9)
+
+    with caplog.at_level(logging.WARNING, logger="core.profiler"), engine.connect() as connection:
+        connection.execute(select(Item.id).where(Item.price > 5)).all()
+
+    [record] = [record for record in caplog.records if record.name == "core.profiler"]
+    assert "FROM item" in record.getMessage()
+    assert "ix_item_price" in record.getMessage()
+    assert "EXPLAIN failed" not in record.getMessage()
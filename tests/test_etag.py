@@ -0,0 +1,70 @@
+from starlette import status
+
+
+def get(client, path: str, etag: str | None = None, **params):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(path, params=params, headers=headers)
+
+
+def test_item_etag_revalidates_until_update(client, make_item):
+    item = make_item(price=10)
+    path = f"/items/{item['id']}"
+
+    first = get(client, path)
+    etag = first.headers["etag"]
+    not_modified = get(client, path, etag)
+
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    client.patch(path, json={"price": 11})
+    changed = get(client, path, etag)
+
+    assert changed.status_code == status.HTTP_200_OK
+    assert changed.json()["price"] == 11
+    assert changed.headers["etag"] != etag
+
+
+def test_if_none_match_lists_and_wildcard(client, make_user):
+    user = make_user()
+    path = f"/users/{user['id']}"
+    etag = get(client, path).headers["etag"]
+
+    assert get(client, path, f'"other", {etag}').status_code == status.HTTP_304_NOT_MODIFIED
+    assert get(client, path, f"W/{etag}").status_code == status.HTTP_304_NOT_MODIFIED
+    assert get(client, path, "*").status_code == status.HTTP_304_NOT_MODIFIED
+    assert get(client, path, '"other"').status_code == status.HTTP_200_OK
+
+
+def test_page_etag_changes_with_rows_in_window(client, make_item):
+    first = make_item()
+    second = make_item()
+    params = {"after": first["id"] - 1, "limit": 2}
+
+    etag = get(client, "/items/", **params).headers["etag"]
+
+    assert etag.startswith("W/")
+    assert get(client, "/items/", etag, **params).status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.patch(f"/items/{second['id']}", json={"quantity_in_stock": 1})
+    changed = get(client, "/items/", etag, **params)
+
+    assert changed.status_code == status.HTTP_200_OK
+    assert changed.headers["etag"] != etag
+
+
+def test_cart_etag_changes_when_lines_change(client, make_user, make_item):
+    user = make_user()
+    item = make_item()
+    path = f"/users/{user['id']}/cart"
+    client.post(f"{path}/items/{item['id']}")
+
+    etag = get(client, path).headers["etag"]
+    assert get(client, path, etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.post(f"{path}/items/{item['id']}")
+    changed = get(client, path, etag)
+
+    assert changed.status_code == status.HTTP_200_OK
+    assert changed.json()["items"] == [{"item_id": item["id"], "qty": 2}]
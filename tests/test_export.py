@@ -0,0 +1,53 @@
+import csv
+import gzip
+import io
+import json
+
+from core.config import settings
+from core.export import ExportEncoder
+
+
+def raw_export(client, path: str, **params) -> tuple[dict, bytes]:
+    # тело как пришло по сети: TestClient иначе сам распакует gzip
+    with client.stream("GET", path, params=params) as response:
+        assert response.status_code == 200
+        return response.headers, b"".join(response.iter_raw())
+
+
+def test_gzip_stream_is_one_valid_gzip_member():
+    encoder = ExportEncoder(["id", "name"], "csv", gzip=True)
+
+    body = encoder.header() + encoder.encode([(1, "a")]) + encoder.encode([(2, "b,c")]) + encoder.finish()
+
+    assert gzip.decompress(body) == b'id,name\r\n1,a\r\n2,"b,c"\r\n'
+
+
+def test_items_ndjson_export_streams_every_row(client, make_item, monkeypatch):
+    # пачка меньше таблицы: выгрузка идёт через несколько partitions
+    monkeypatch.setattr(settings, "export_batch_size", 2)
+    item = make_item(name="exported item", price=42)
+
+    headers, body = raw_export(client, "/items/export")
+    rows = [json.loads(line) for line in body.splitlines()]
+
+    assert headers["content-type"] == "application/x-ndjson"
+    assert len({row["id"] for row in rows}) == len(rows) > 2
+    assert {key: rows[-1][key] for key in ("id", "name", "price")} == {
+        "id": item["id"],
+        "name": "exported item",
+        "price": 42,
+    }
+
+
+def test_users_gzip_csv_export_matches_plain(client, make_user):
+    user = make_user()
+
+    headers, compressed = raw_export(client, "/users/export", format="csv", gzip=True)
+    _, plain = raw_export(client, "/users/export", format="csv")
+
+    assert headers["content-encoding"] == "gzip"
+    assert 'filename="users.csv"' in headers["content-disposition"]
+    assert gzip.decompress(compressed) == plain
+    rows = list(csv.DictReader(io.StringIO(plain.decode())))
+    assert "password" not in rows[0]
+    assert rows[-1]["email"] == user["email"]
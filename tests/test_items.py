@@ -0,0 +1,75 @@
+from sqlmodel import select
+
+from core.database import engine
+from core.metrics import QUERY_COUNT_HEADER
+from items.crud import MAX_BOUND_PARAMS, TOTAL_PRICE_PARAMS_PER_ID, nearest_rank
+from items.model import Item, ItemRead
+
+MISSING_ID = 10**9
+
+
+def calculate_total(client, lines) -> float:
+    response = client.post("/items/calculate-total/", json=lines)
+    assert response.status_code == 202, response.text
+    return response.json()
+
+
+def test_calculate_total_of_empty_list_is_zero(client):
+    assert calculate_total(client, []) == 0.0
+
+
+def test_calculate_total_counts_quantities(client, make_item):
+    first = make_item(price=10)
+    second = make_item(price=3)
+
+    lines = [first["id"], first["id"], {"item_id": second["id"], "qty": 4}, MISSING_ID]
+
+    assert calculate_total(client, lines) == 32
+
+
+def test_calculate_total_of_long_list_stays_under_parameter_limit(client, make_item):
+    first = make_item(price=10)
+    second = make_item(price=3)
+    # столько разных id, что CASE с IN не влезли бы в лимит параметров — считается через временную таблицу
+    missing = range(MISSING_ID, MISSING_ID + MAX_BOUND_PARAMS // TOTAL_PRICE_PARAMS_PER_ID + 1)
+
+    lines = [first["id"], {"item_id": second["id"], "qty": 2}, *missing]
+
+    assert calculate_total(client, lines) == 16
+    # временная таблица не остаётся заполненной для следующего запроса
+    assert calculate_total(client, [first["id"]]) == 10
+
+
+def test_items_by_owner_are_item_read_rows(client, make_item):
+    # в сиде у товаров свои владельцы — берём id, которого там нет
+    owner_id = MISSING_ID + 1
+    first, second = make_item(), make_item()
+    for item in (second, first):
+        client.patch(f"/items/{item['id']}", json={"owner_id": owner_id})
+
+    response = client.get(f"/items/get_by_owner/{owner_id}")
+
+    assert response.status_code == 200
+    items = response.json()
+    assert [item["id"] for item in items] == [first["id"], second["id"]]
+    assert set(items[0]) == set(ItemRead.model_fields)
+    assert items[0]["owner_id"] == owner_id
+    assert client.get(f"/items/get_by_owner/{MISSING_ID}").status_code == 404
+
+
+def test_price_percentiles_take_one_ranked_query(client, make_item):
+    for price in (1, 5, 9):
+        make_item(price=price)
+    with engine.connect() as connection:
+        prices = connection.execute(select(Item.price).order_by(Item.price)).scalars().all()
+    percentiles = [1, 50, 90, 99.5, 100]
+
+    response = client.get("/items/stats/price-percentiles", params={"p": percentiles})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "count": len(prices),
+        "percentiles": {f"{p:g}": prices[nearest_rank(p, len(prices)) - 1] for p in percentiles},
+    }
+    # COUNT и один запрос с ROW_NUMBER на все перцентили, а не по запросу на каждый
+    assert response.headers[QUERY_COUNT_HEADER] == "2"
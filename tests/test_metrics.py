@@ -0,0 +1,35 @@
+from core.metrics import QUERY_COUNT_HEADER, UNMATCHED_ROUTE, Histogram
+
+
+def metric_value(body: str, series: str) -> float:
+    # серии ещё нет — значит, запросов с такими метками не было
+    values = [line.rsplit(" ", 1)[1] for line in body.splitlines() if line.startswith(series + " ")]
+    return float(values[0]) if values else 0.0
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert (histogram.count, histogram.sum) == (4, 3.65)
+
+
+def test_metrics_are_labelled_by_route_template(client, make_item):
+    item = make_item()
+    route = 'method="PATCH",route="/items/{item_id}"'
+    requests = f'http_requests_total{{{route},status="200"}}'
+    requests_before = metric_value(client.get("/metrics").text, requests)
+
+    response = client.patch(f"/items/{item['id']}", json={"price": 11})
+    client.get(f"/no-such-route/{item['id']}")
+    body = client.get("/metrics").text
+
+    # UPDATE ... RETURNING — один запрос к базе
+    assert response.headers[QUERY_COUNT_HEADER] == "1"
+    assert metric_value(body, requests) == requests_before + 1
+    assert metric_value(body, f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}') >= 1
+    assert metric_value(body, f"db_queries_total{{{route}}}") >= 1
+    assert f'route="{UNMATCHED_ROUTE}",status="404"' in body
+    assert f"/no-such-route/{item['id']}" not in body
@@ -0,0 +1,39 @@
+from starlette import status
+
+from core.config import settings
+
+
+def page(client, path: str, **params) -> dict:
+    response = client.get(path, params=params)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return response.json()
+
+
+def test_items_keyset_pages_follow_cursor(client, make_item):
+    first, second, third = make_item(), make_item(), make_item()
+
+    head = page(client, "/items/", after=first["id"] - 1, limit=2)
+    tail = page(client, "/items/", after=head["next_cursor"], limit=2)
+
+    assert [item["id"] for item in head["items"]] == [first["id"], second["id"]]
+    assert head["next_cursor"] == second["id"]
+    # последняя страница короче limit — курсора дальше нет
+    assert [item["id"] for item in tail["items"]] == [third["id"]]
+    assert tail["next_cursor"] is None
+
+
+def test_users_keyset_pages_follow_cursor(client, make_user):
+    first, second = make_user(), make_user()
+
+    head = page(client, "/users/", after=first["id"] - 1, limit=1)
+    tail = page(client, "/users/", after=head["next_cursor"], limit=1)
+
+    assert [user["id"] for user in head["users"]] == [first["id"]]
+    assert [user["id"] for user in tail["users"]] == [second["id"]]
+    assert tail["next_cursor"] is None
+
+
+def test_page_size_is_capped(client):
+    response = client.get("/items/", params={"limit": settings.max_page_size + 1})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
@@ -0,0 +1,54 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from core import database
+from core.config import settings
+from core.database import engine, engine_options, tune_engine
+from core.pool import TimedQueuePool, pool_status
+
+
+def pragma(connection, name: str):
+    return connection.execute(text(f"PRAGMA {name}")).scalar_one()
+
+
+def test_file_database_gets_configured_queue_pool(monkeypatch):
+    monkeypatch.setattr(settings, "pool_size", 3)
+    monkeypatch.setattr(settings, "max_overflow", 1)
+    monkeypatch.setattr(settings, "pool_pre_ping", True)
+
+    options = engine_options("sqlite:///shop.db")
+
+    assert options["poolclass"] is TimedQueuePool
+    assert (options["pool_size"], options["max_overflow"], options["pool_pre_ping"]) == (3, 1, True)
+
+
+def test_memory_database_shares_one_connection():
+    options = engine_options("sqlite://")
+
+    assert options["poolclass"] is StaticPool
+    assert "pool_size" not in options
+
+
+def test_sqlite_pragmas_follow_settings(tmp_path, monkeypatch):
+    monkeypatch.setitem(database.SQLITE_PRAGMAS, "synchronous", "FULL")
+    monkeypatch.setitem(database.SQLITE_PRAGMAS, "journal_mode", "DELETE")
+    url = f"sqlite:///{tmp_path / 'pragmas.db'}"
+    tuned = tune_engine(create_engine(url, **engine_options(url)))
+    try:
+        with tuned.connect() as connection:
+            assert pragma(connection, "journal_mode") == "delete"
+            assert pragma(connection, "synchronous") == 2  # FULL
+            assert pragma(connection, "busy_timeout") == settings.sqlite_busy_timeout
+    finally:
+        tuned.dispose()
+
+
+def test_pool_counts_checkouts():
+    before = pool_status(engine.pool).checkouts
+
+    with engine.connect() as connection:
+        assert pragma(connection, "journal_mode") == settings.sqlite_journal_mode.lower()
+
+    status = pool_status(engine.pool)
+    assert status.pool_class == "TimedQueuePool"
+    assert status.checkouts == before + 1
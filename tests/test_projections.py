@@ -0,0 +1,30 @@
+from core.database import schema_columns
+from items.model import Item, ItemReadShort
+from users.model import User, UserRead, UserReadShort
+
+
+def test_schema_columns_follow_response_schema():
+    assert [column.key for column in schema_columns(Item, ItemReadShort)] == list(ItemReadShort.model_fields)
+    assert [column.key for column in schema_columns(User, UserReadShort)] == ["id", "first_name", "last_name", "email"]
+
+
+def test_list_pages_carry_only_short_fields(client, make_item, make_user):
+    item = make_item()
+    user = make_user()
+
+    items = client.get("/items/", params={"after": item["id"] - 1, "limit": 1}).json()["items"]
+    users = client.get("/users/", params={"after": user["id"] - 1, "limit": 1}).json()["users"]
+
+    assert items == [{field: item[field] for field in ItemReadShort.model_fields}]
+    assert users == [{field: user[field] for field in UserReadShort.model_fields}]
+
+
+def test_user_read_validates_stored_float_balance(client, make_user):
+    user = make_user(balance=250)
+
+    body = client.get(f"/users/{user['id']}").json()
+
+    # в таблице balance float — в ответе он остаётся целым, как в схеме
+    assert body["balance"] == 250
+    assert isinstance(body["balance"], int)
+    assert set(body) == set(UserRead.model_fields)
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+BUYERS = 20
+
+
+def buy(client: TestClient, user_id: int, item_id: int) -> int:
+    return client.post(f"/users/{user_id}/items", params={"item_id": item_id}).status_code
+
+
+def test_buy_item_debits_balance_and_stock(client, make_user, make_item):
+    user = make_user(balance=100)
+    item = make_item(price=30, quantity_in_stock=2)
+
+    response = client.post(f"/users/{user['id']}/items", params={"item_id": item["id"]})
+
+    assert response.status_code == 201
+    assert response.json()["new_balance"] == 70
+    assert client.get(f"/items/{item['id']}").json()["quantity_in_stock"] == 1
+    assert client.get(f"/users/{user['id']}").json()["balance"] == 70
+
+
+def test_failed_purchase_changes_nothing(client, make_user, make_item):
+    user = make_user(balance=100, age=16)
+    adult_item = make_item(price=10, adult_product=True)
+    expensive_item = make_item(price=500)
+
+    assert client.post(f"/users/{user['id']}/items", params={"item_id": adult_item["id"]}).status_code == 400
+    assert client.post(f"/users/{user['id']}/items", params={"item_id": expensive_item["id"]}).status_code == 400
+    assert client.post(f"/users/{user['id']}/items", params={"item_id": 10**9}).status_code == 404
+
+    assert client.get(f"/users/{user['id']}").json()["balance"] == 100
+    assert client.get(f"/items/{adult_item['id']}").json()["quantity_in_stock"] == 10
+
+
+def test_concurrent_purchases_never_oversell_stock(client, make_user, make_item):
+    item = make_item(price=10, quantity_in_stock=5)
+    users = [make_user(balance=100) for _ in range(BUYERS)]
+
+    with ThreadPoolExecutor(BUYERS) as pool:
+        statuses = list(pool.map(lambda user: buy(client, user["id"], item["id"]), users))
+
+    assert statuses.count(201) == 5
+    assert statuses.count(400) == BUYERS - 5
+    assert client.get(f"/items/{item['id']}").json()["quantity_in_stock"] == 0
+    balances = [client.get(f"/users/{user['id']}").json()["balance"] for user in users]
+    assert sorted(balances) == [90] * 5 + [100] * (BUYERS - 5)
+
+
+def test_concurrent_purchases_never_overdraw_balance(client, make_user, make_item):
+    user = make_user(balance=30)
+    item = make_item(price=10, quantity_in_stock=100)
+
+    with ThreadPoolExecutor(BUYERS) as pool:
+        statuses = list(pool.map(lambda _: buy(client, user["id"], item["id"]), range(BUYERS)))
+
+    assert statuses.count(201) == 3
+    assert client.get(f"/users/{user['id']}").json()["balance"] == 0
+    assert client.get(f"/items/{item['id']}").json()["quantity_in_stock"] == 97
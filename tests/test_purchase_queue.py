@@ -0,0 +1,101 @@
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from core.config import settings
+from tests.test_purchase import BUYERS, buy
+from users.purchase_queue import PurchaseQueue, item_purchase, purchase_queue
+
+MISSING_ID = 10**9
+
+
+@pytest.fixture
+def writer() -> Iterator[PurchaseQueue]:
+    # длинное окно сбора: всё, что отправлено подряд, попадает в одну пачку
+    purchases = PurchaseQueue(batch_size=16, batch_wait_ms=200)
+    purchases.start()
+    yield purchases
+    purchases.stop()
+
+
+@pytest.fixture
+def queued_purchases(monkeypatch) -> Iterator[None]:
+    monkeypatch.setattr(settings, "purchase_queue_enabled", True)
+    # при PURCHASE_QUEUE_ENABLED=true очередь уже запущена lifespan — её и останавливает lifespan
+    started_here = not purchase_queue.running
+    purchase_queue.start()
+    yield
+    if started_here:
+        purchase_queue.stop()
+
+
+def test_failed_purchase_does_not_abort_batch(client, writer, make_user, make_item):
+    user = make_user(balance=100)
+    item = make_item(price=10, quantity_in_stock=10)
+
+    def broken(session: Session):
+        # списание уже прошло, когда покупка упала — его должен откатить SAVEPOINT
+        item_purchase(user["id"], item["id"])(session)
+        msg = "broken purchase"
+        raise RuntimeError(msg)
+
+    futures = [
+        writer.submit(item_purchase(user["id"], item["id"])),
+        writer.submit(broken),
+        writer.submit(item_purchase(user["id"], MISSING_ID)),
+        writer.submit(item_purchase(user["id"], item["id"])),
+    ]
+
+    assert futures[0].result()["new_balance"] == 90
+    with pytest.raises(RuntimeError, match="broken purchase"):
+        futures[1].result()
+    with pytest.raises(HTTPException) as missing:
+        futures[2].result()
+    assert missing.value.status_code == 404
+    assert futures[3].result()["new_balance"] == 80
+
+    assert client.get(f"/users/{user['id']}").json()["balance"] == 80
+    assert client.get(f"/items/{item['id']}").json()["quantity_in_stock"] == 8
+
+
+def writer_threads() -> int:
+    return sum(thread.name == "purchase-writer" for thread in threading.enumerate())
+
+
+def test_second_start_reuses_writer():
+    before = writer_threads()
+    purchases = PurchaseQueue(batch_size=1, batch_wait_ms=0)
+    purchases.start()
+    purchases.start()
+
+    assert writer_threads() == before + 1
+    # второй start не оставляет писателя, которого stop не дождётся
+    stopper = threading.Thread(target=purchases.stop)
+    stopper.start()
+    stopper.join(timeout=5)
+    assert not stopper.is_alive()
+    assert not purchases.running
+
+
+def test_submit_requires_started_queue():
+    with pytest.raises(RuntimeError, match="not started"):
+        PurchaseQueue(batch_size=1, batch_wait_ms=0).submit(item_purchase(1, 1))
+
+
+@pytest.mark.usefixtures("queued_purchases")
+def test_queued_purchases_never_oversell_stock(client, make_user, make_item):
+    item = make_item(price=10, quantity_in_stock=5)
+    users = [make_user(balance=100) for _ in range(BUYERS)]
+
+    with ThreadPoolExecutor(BUYERS) as pool:
+        statuses = list(pool.map(lambda user: buy(client, user["id"], item["id"]), users))
+
+    assert statuses.count(201) == 5
+    assert statuses.count(400) == BUYERS - 5
+    assert client.get(f"/items/{item['id']}").json()["quantity_in_stock"] == 0
+    balances = [client.get(f"/users/{user['id']}").json()["balance"] for user in users]
+    assert sorted(balances) == [90] * 5 + [100] * (BUYERS - 5)
@@ -0,0 +1,26 @@
+import pytest
+from sqlmodel import Session, func, select
+
+from core.database import engine
+from core.query_plans import check_query_plans
+from items.model import Item
+from users.model import User
+
+
+def count(model) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(model)).one()
+
+
+# клиент поднимает схему через lifespan
+@pytest.mark.usefixtures("client")
+def test_hot_queries_use_indexes():
+    users_before, items_before = count(User), count(Item)
+
+    plans = check_query_plans(engine)
+
+    # второй запрос selectinload — товары пользователей — тоже выполнен и проверен
+    assert any("ix_item_owner_id" in detail for detail in plans["users_with_items"])
+    assert any("cartitem" in detail for detail in plans["cart_totals"])
+    # пробные строки откатываются
+    assert (count(User), count(Item)) == (users_before, items_before)
@@ -0,0 +1,117 @@
+import sqlite3
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import settings
+from core.database import async_replicas, engine, replicas
+from core.replicas import STICKY_COOKIE, ReplicaSet
+from tests.conftest import TMP_DIR
+
+
+@pytest.fixture
+def replica_set(client, monkeypatch) -> Iterator[ReplicaSet]:
+    # набор реплик того режима, в котором работают роуты чтения
+    active = async_replicas if settings.async_mode else replicas
+    engines: list[Any] = []
+    monkeypatch.setattr(active, "engines", engines)
+    monkeypatch.setattr(active, "_unhealthy_until", {})
+    yield active
+    for replica_engine in engines:
+        if settings.async_mode:
+            client.portal.call(replica_engine.dispose)
+        else:
+            replica_engine.dispose()
+
+
+def attach_replica(replica_set: ReplicaSet, path: Path):
+    if settings.async_mode:
+        replica_set.engines[:] = [create_async_engine(f"sqlite+aiosqlite:///{path}")]
+    else:
+        replica_set.engines[:] = [create_engine(f"sqlite:///{path}")]
+
+
+@pytest.fixture
+def snapshot_replica(replica_set) -> Callable[[], None]:
+    # реплика — снимок основной базы на момент вызова: дальше она «отстаёт» от основного
+    path = TMP_DIR / "replica.db"
+
+    def snapshot():
+        path.unlink(missing_ok=True)
+        raw = engine.raw_connection()
+        try:
+            with sqlite3.connect(path) as target:
+                raw.driver_connection.backup(target)
+        finally:
+            raw.close()
+        attach_replica(replica_set, path)
+
+    return snapshot
+
+
+@pytest.fixture
+def broken_replica(replica_set) -> ReplicaSet:
+    # база без таблиц: соединение есть, любой запрос падает
+    path = TMP_DIR / "broken-replica.db"
+    path.unlink(missing_ok=True)
+    attach_replica(replica_set, path)
+    return replica_set
+
+
+def sticky() -> dict[str, str]:
+    return {"cookie": f"{STICKY_COOKIE}={time.time() + 60:.3f}"}
+
+
+def test_reads_go_to_replica(client, make_item, snapshot_replica):
+    item = make_item(price=238)
+    snapshot_replica()
+    client.patch(f"/items/{item['id']}", json={"price": 999})
+
+    assert client.get(f"/items/{item['id']}").json()["price"] == 238
+
+
+def test_lagging_replica_does_not_fill_cache(client, make_item, snapshot_replica):
+    item = make_item(price=238)
+    snapshot_replica()
+    assert client.patch(f"/items/{item['id']}", json={"price": 999}).status_code == 200
+
+    stale = client.get(f"/items/{item['id']}")
+    fresh = client.get(f"/items/{item['id']}", headers=sticky())
+
+    assert stale.json()["price"] == 238
+    assert fresh.json()["price"] == 999
+    assert fresh.headers["etag"] != stale.headers["etag"]
+
+
+def test_lagging_replica_does_not_fill_user_cache(client, make_user, snapshot_replica):
+    user = make_user(balance=100)
+    snapshot_replica()
+    assert client.patch(f"/users/{user['id']}", json={"balance": 500}).status_code == 200
+
+    assert client.get(f"/users/{user['id']}").json()["balance"] == 100
+    assert client.get(f"/users/{user['id']}", headers=sticky()).json()["balance"] == 500
+
+
+def test_failed_replica_query_is_retried_on_primary(client, make_item, broken_replica):
+    item = make_item(price=238)
+
+    response = client.get(f"/items/{item['id']}")
+
+    assert response.status_code == 200
+    assert response.json()["price"] == 238
+    assert broken_replica.pick() is None
+
+
+def test_failed_replica_relationship_query_is_retried_on_primary(client, make_user, broken_replica):
+    user = make_user()
+
+    response = client.get(f"/users/with_items/{user['id']}")
+
+    assert response.status_code == 200
+    assert response.json()["id"] == user["id"]
+    assert broken_replica.pick() is None
@@ -0,0 +1,48 @@
+from starlette import status
+
+from core.metrics import QUERY_COUNT_HEADER
+
+ITEM = {"name": "returning item", "description": "test", "price": 10, "quantity_in_stock": 5, "adult_product": False}
+MISSING_ID = 10**9
+
+
+def queries(response) -> int:
+    return int(response.headers[QUERY_COUNT_HEADER])
+
+
+def test_item_writes_take_one_statement(client):
+    created = client.post("/items/0", json=ITEM)
+    item = created.json()
+    path = f"/items/{item['id']}"
+
+    updated = client.patch(path, json={"price": 12, "owner_id": 7})
+    deleted = client.delete(path)
+
+    # ответ — сохранённая строка из RETURNING, а не эхо входных данных
+    assert updated.json() == item | {"price": 12, "owner_id": 7, "version": item["version"] + 1}
+    assert deleted.status_code == status.HTTP_200_OK
+    assert [queries(created), queries(updated), queries(deleted)] == [1, 1, 1]
+    assert client.get(path).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_user_writes_take_one_statement(client, make_user):
+    user = make_user(balance=50)
+    path = f"/users/{user['id']}"
+
+    updated = client.patch(path, json={"age": 41})
+    deleted = client.delete(path)
+
+    assert updated.json() == user | {"age": 41, "version": user["version"] + 1}
+    assert [queries(updated), queries(deleted)] == [1, 1]
+    assert client.get(path).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_missing_rows_are_404_without_extra_lookup(client):
+    for response in (
+        client.patch(f"/items/{MISSING_ID}", json={"price": 1}),
+        client.delete(f"/items/{MISSING_ID}"),
+        client.patch(f"/users/{MISSING_ID}", json={"age": 1}),
+        client.delete(f"/users/{MISSING_ID}"),
+    ):
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert queries(response) == 1
@@ -0,0 +1,70 @@
+import uuid
+
+
+def word() -> str:
+    # слово, которого больше нет ни в одном товаре
+    return f"w{uuid.uuid4().hex[:12]}"
+
+
+def search(client, **params) -> list[int]:
+    response = client.get("/items/search", params=params)
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()["items"]]
+
+
+def test_created_item_is_found_by_name_and_description(client, make_item):
+    name_word, description_word = word(), word()
+    item = make_item(name=f"Red {name_word}", description=f"made of {description_word}")
+
+    assert search(client, q=name_word) == [item["id"]]
+    assert search(client, q=description_word.upper()) == [item["id"]]
+    assert search(client, q=f"{name_word} {description_word}") == [item["id"]]
+    assert search(client, q=f"{name_word} {word()}") == []
+
+
+def test_bulk_created_items_are_indexed(client):
+    tag = word()
+    rows = [
+        {"name": f"{tag} {n}", "description": "bulk", "price": n, "quantity_in_stock": 1, "adult_product": False}
+        for n in range(3)
+    ]
+
+    ids = client.post("/items/bulk", json=rows).json()["ids"]
+
+    assert search(client, q=tag) == ids
+
+
+def test_renamed_item_is_reindexed(client, make_item):
+    old, new = word(), word()
+    item = make_item(name=old)
+
+    client.patch(f"/items/{item['id']}", json={"name": new})
+
+    assert search(client, q=old) == []
+    assert search(client, q=new) == [item["id"]]
+
+
+def test_price_update_keeps_item_indexed(client, make_item):
+    tag = word()
+    item = make_item(name=tag, price=10)
+
+    client.patch(f"/items/{item['id']}", json={"price": 99})
+
+    assert search(client, q=tag, min_price=50) == [item["id"]]
+
+
+def test_deleted_item_leaves_index(client, make_item):
+    tag = word()
+    item = make_item(name=tag)
+
+    assert client.delete(f"/items/{item['id']}").status_code == 200
+
+    assert search(client, q=tag) == []
+
+
+def test_fts_operators_in_query_are_plain_words(client, make_item):
+    tag = word()
+    make_item(name=tag)
+
+    assert search(client, q=f'{tag} OR "NEAR(') == []
+    assert search(client, q=f"{tag}*") != []
@@ -0,0 +1,40 @@
+import json
+import uuid
+
+import pytest
+from sqlmodel import Session, func, select
+
+from core.database import engine, load_data_from_json
+from helper.files import iter_json_records
+from items.model import Item
+
+
+def seed_item(name: str) -> dict:
+    return {"name": name, "description": "seeded", "price": 1, "quantity_in_stock": 1, "adult_product": False}
+
+
+def test_json_records_stream_through_small_chunks(tmp_path):
+    path = tmp_path / "seed.json"
+    path.write_text(
+        json.dumps({"users": [{"id": 1, "note": "a, b]"}, {"id": 2}], "items": {"7": {"price": 12345}}, "empty": []}),
+    )
+
+    # буфер короче записи: разбор дочитывает файл по ходу
+    records = list(iter_json_records(path, chunk_size=3))
+
+    assert records == [("users", {"id": 1, "note": "a, b]"}), ("users", {"id": 2}), ("items", {"price": 12345})]
+
+
+@pytest.mark.usefixtures("client")
+def test_seed_inserts_missing_rows_in_batches(tmp_path):
+    tag = uuid.uuid4().hex[:8]
+    names = [f"seed {tag} {n}" for n in range(5)]
+    path = tmp_path / "seed.json"
+    # повтор внутри файла и строка из соседней пачки вставляются один раз
+    path.write_text(json.dumps({"items": [seed_item(name) for name in [*names, names[0], names[3]]]}))
+
+    assert load_data_from_json(str(path), batch_size=2) == {"users": 0, "items": 5}
+    assert load_data_from_json(str(path), batch_size=2) == {"users": 0, "items": 0}
+
+    with Session(engine) as session:
+        assert session.exec(select(func.count(Item.id)).where(Item.name.in_(names))).one() == len(names)
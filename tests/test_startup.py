@@ -0,0 +1,35 @@
+import json
+import uuid
+
+import pytest
+
+from core.database import seed_from_json
+from main import startup_timings
+
+
+def write_seed(path, *names: str):
+    items = [
+        {"name": name, "description": "seeded", "price": 1, "quantity_in_stock": 1, "adult_product": False}
+        for name in names
+    ]
+    path.write_text(json.dumps({"items": items}))
+
+
+@pytest.mark.usefixtures("client")
+def test_startup_times_every_phase():
+    assert {"imports", "routers", "lock", "metadata", "seed", "warmup"} <= set(startup_timings)
+    assert all(ms >= 0 for ms in startup_timings.values())
+
+
+@pytest.mark.usefixtures("client")
+def test_unchanged_seed_file_is_not_parsed_again(tmp_path):
+    path = tmp_path / "seed.json"
+    first, second = f"seed {uuid.uuid4().hex[:8]}", f"seed {uuid.uuid4().hex[:8]}"
+    write_seed(path, first)
+
+    assert seed_from_json(str(path)) == {"users": 0, "items": 1}
+    assert seed_from_json(str(path)) is None
+
+    write_seed(path, first, second)
+    # изменённый файл разбирается заново, уже загруженные строки не дублируются
+    assert seed_from_json(str(path)) == {"users": 0, "items": 1}
@@ -0,0 +1,29 @@
+from starlette import status
+
+from core.metrics import QUERY_COUNT_HEADER
+
+
+def test_users_with_items_load_in_two_queries(client, make_user, make_item):
+    owner, other, without_items = make_user(), make_user(), make_user()
+    owned = {owner["id"]: [make_item(), make_item()], other["id"]: [make_item()]}
+    for owner_id, items in owned.items():
+        for item in items:
+            client.patch(f"/items/{item['id']}", json={"owner_id": owner_id})
+    ids = [other["id"], without_items["id"], owner["id"], 10**9]
+
+    response = client.get("/users/with_items", params={"ids": ids})
+
+    assert response.status_code == status.HTTP_200_OK
+    users = response.json()
+    assert [user["id"] for user in users] == [owner["id"], other["id"], without_items["id"]]
+    assert [sorted(item["id"] for item in user["items"]) for user in users] == [
+        sorted(item["id"] for item in owned[owner["id"]]),
+        [owned[other["id"]][0]["id"]],
+        [],
+    ]
+    # пользователи и товары всех пользователей — по одному запросу
+    assert response.headers[QUERY_COUNT_HEADER] == "2"
+
+
+def test_user_with_items_of_missing_user_is_404(client):
+    assert client.get(f"/users/with_items/{10**9}").status_code == status.HTTP_404_NOT_FOUND
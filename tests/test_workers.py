@@ -0,0 +1,68 @@
+import threading
+
+from sqlalchemy import create_engine
+
+from core.cache import MISSING, LRUCache, local_cache_maxsize
+from core.config import settings
+from core.database import engine_options
+from core.startup import startup_lock, warm_pool
+from main import app
+
+
+def test_process_cache_is_off_with_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "workers", 4)
+    monkeypatch.setattr(settings, "cache_maxsize", 100)
+    worker_cache = LRUCache(maxsize=local_cache_maxsize(), ttl=60)
+
+    worker_cache.set("item:1", "cached body")
+
+    assert worker_cache.get("item:1") is MISSING
+
+
+def test_process_cache_is_on_with_one_worker(monkeypatch):
+    monkeypatch.setattr(settings, "workers", 1)
+    monkeypatch.setattr(settings, "cache_maxsize", 100)
+
+    assert local_cache_maxsize() == 100
+
+
+def test_startup_lock_lets_workers_in_one_at_a_time(tmp_path):
+    path = str(tmp_path / "startup.lock")
+    order = []
+    first_inside = threading.Event()
+
+    def second_worker():
+        first_inside.wait()
+        with startup_lock(path):
+            order.append("second")
+
+    waiting = threading.Thread(target=second_worker)
+    waiting.start()
+    with startup_lock(path):
+        first_inside.set()
+        # второй воркер ждёт, пока первый держит блокировку
+        waiting.join(timeout=0.2)
+        order.append("first")
+    waiting.join(timeout=5)
+
+    assert order == ["first", "second"]
+
+
+def test_warm_pool_opens_pool_size_connections(tmp_path):
+    url = f"sqlite:///{tmp_path / 'warm.db'}"
+    db_engine = create_engine(url, **engine_options(url))
+    try:
+        warm_pool(db_engine, 3)
+
+        assert db_engine.pool.checkedin() == 3
+    finally:
+        db_engine.dispose()
+
+
+def test_not_ready_until_warm(client, monkeypatch):
+    monkeypatch.setattr(app.state, "ready", False)
+
+    response = client.get("/ready")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "starting"}
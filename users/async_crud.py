@@ -0,0 +1,256 @@
+"""Async-версии функций из users.crud для работы через AsyncSession."""
+
+from fastapi import HTTPException
+from sqlalchemy import Row, insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.cache import MISSING, cache
+from core.config import settings
+from core.database import is_primary
+from core.etag import collection_etag, page_fingerprint_statement
+from items.crud import item_cache_key
+from items.model import Item
+from users.crud import (
+    USER_READ_COLUMNS,
+    USER_SHORT_COLUMNS,
+    cart_checkout_error,
+    cart_checkout_statements,
+    cart_create_error,
+    cart_create_statement,
+    cart_delete_statement,
+    cart_from_rows,
+    cart_item_add_statement,
+    cart_item_remove_statement,
+    cart_items_delete_statement,
+    cart_items_exist_statement,
+    cart_items_missing_error,
+    cart_lines,
+    cart_link_statement,
+    cart_purchase_response,
+    cart_read_statement,
+    cart_totals_statement,
+    cart_touch_statement,
+    purchase_error,
+    purchase_response,
+    purchase_statements,
+    user_cache_key,
+    user_create_statement,
+    user_delete_statement,
+    user_update_statement,
+    users_with_items_statement,
+)
+from users.model import (
+    CartItem,
+    CartLine,
+    CartRead,
+    User,
+    UserCartCreate,
+    UserCartRead,
+    UserCreate,
+    UserPage,
+    UserRead,
+    UserReadShort,
+    UserUpdate,
+    UserWithItems,
+)
+
+
+async def user_create(user_in: UserCreate, session: AsyncSession) -> UserRead:
+    row = (await session.execute(user_create_statement(user_in))).one()
+    await session.commit()
+    return UserRead.model_validate(row, from_attributes=True)
+
+
+async def user_read_all(session: AsyncSession, limit: int = settings.page_size, after: int | None = None) -> UserPage:
+    statement = select(*USER_SHORT_COLUMNS).order_by(User.id).limit(limit + 1)
+    if after is not None:
+        statement = statement.where(User.id > after)
+
+    rows = (await session.exec(statement)).all()
+    users = [UserReadShort.model_construct(**row._mapping) for row in rows[:limit]]
+    next_cursor = users[-1].id if len(rows) > limit else None
+    return UserPage.model_construct(users=users, next_cursor=next_cursor)
+
+
+async def users_page_etag(session: AsyncSession, limit: int = settings.page_size, after: int | None = None) -> str:
+    return collection_etag((await session.exec(page_fingerprint_statement(User, limit, after))).one())
+
+
+async def user_read(user_id: int, session: AsyncSession) -> UserRead:
+    cached = cache.get(user_cache_key(user_id))
+    if cached is not MISSING:
+        return cached
+
+    row = (await session.exec(select(*USER_READ_COLUMNS).where(User.id == user_id))).first()
+    if not row:
+        msg = f"user {user_id} is not found."
+        raise HTTPException(status_code=404, detail=msg)
+
+    user_out = UserRead.model_validate(row, from_attributes=True)
+    if is_primary(session):
+        cache.set(user_cache_key(user_id), user_out)
+    return user_out
+
+
+async def user_update(user_id: int, user_in: UserUpdate, session: AsyncSession) -> UserRead:
+    row = (await session.execute(user_update_statement(user_id, user_in))).first()
+    if row is None:
+        msg = f"user {user_id} is not found."
+        raise HTTPException(status_code=404, detail=msg)
+    await session.commit()
+    cache.invalidate(user_cache_key(user_id))
+    return UserRead.model_validate(row, from_attributes=True)
+
+
+async def user_delete(user_id: int, session: AsyncSession) -> str:
+    if (await session.execute(user_delete_statement(user_id))).first() is None:
+        msg = f"user {user_id} is not found."
+        raise HTTPException(status_code=404, detail=msg)
+    await session.commit()
+    cache.invalidate(user_cache_key(user_id))
+    return f"Пользователь с id {user_id} удален"
+
+
+async def users_with_items(user_ids: list[int], session: AsyncSession) -> list[UserWithItems]:
+    users = (await session.exec(users_with_items_statement(user_ids))).all()
+    return [UserWithItems.model_validate(user, from_attributes=True) for user in users]
+
+
+async def user_with_items_model(user_id: int, session: AsyncSession) -> UserWithItems:
+    users = await users_with_items([user_id], session)
+    if not users:
+        msg = f"user {user_id} is not found."
+        raise HTTPException(status_code=404, detail=msg)
+    return users[0]
+
+
+async def cart_create(user_id: int, session: AsyncSession) -> Row:
+    cart = (await session.execute(cart_create_statement(user_id))).one()
+    if (await session.execute(cart_link_statement(user_id, cart.id))).first() is None:
+        await session.rollback()
+        raise cart_create_error(await session.get(User, user_id), user_id)
+    return cart
+
+
+async def user_create_cart(cart_in: UserCartCreate, session: AsyncSession) -> CartRead:
+    lines = cart_lines(cart_in.item_ids)
+    if lines and (
+        error := cart_items_missing_error(lines, (await session.exec(cart_items_exist_statement(lines))).all())
+    ):
+        raise error
+    cart = await cart_create(cart_in.user_id, session)
+    if lines:
+        await session.execute(insert(CartItem), [{"cart_id": cart.id, **line.model_dump()} for line in lines])
+    await session.commit()
+    cache.invalidate(user_cache_key(cart_in.user_id))
+    return CartRead.model_construct(**cart._mapping, items=lines)
+
+
+async def user_read_cart(user_id: int, session: AsyncSession) -> CartRead:
+    return cart_from_rows((await session.execute(cart_read_statement(user_id))).all())
+
+
+async def user_delete_cart(user_id: int, session: AsyncSession) -> dict[str, str]:
+    cart_id = (await session.execute(cart_delete_statement(user_id))).scalar_one_or_none()
+    if cart_id is None:
+        raise HTTPException(status_code=404, detail="Cart not found")
+    await session.execute(cart_items_delete_statement(cart_id))
+    await session.execute(cart_link_statement(user_id, None))
+    await session.commit()
+    cache.invalidate(user_cache_key(user_id))
+
+    return {"detail": f"Cart for user {user_id} successfully deleted"}
+
+
+async def user_cart_add_item(user_id: int, item_id: int, qty: int, session: AsyncSession) -> CartLine:
+    cart_id = (await session.execute(cart_touch_statement(user_id))).scalar_one_or_none()
+    if cart_id is None:
+        cart_id = (await cart_create(user_id, session)).id
+        # привязка корзины меняет пользователя (cart_id, version)
+        cache.invalidate(user_cache_key(user_id))
+
+    statement = cart_item_add_statement(cart_id, item_id, qty, session.bind.dialect.name)
+    line = (await session.execute(statement)).first()
+    if line is None:
+        await session.rollback()
+        raise HTTPException(status_code=404, detail=f"Item {item_id} not found")
+    await session.commit()
+    return CartLine.model_construct(**line._mapping)
+
+
+async def user_cart_remove_item(user_id: int, item_id: int, session: AsyncSession) -> dict[str, str]:
+    cart_id = (await session.execute(cart_touch_statement(user_id))).scalar_one_or_none()
+    if cart_id is None:
+        raise HTTPException(status_code=404, detail="Cart not found")
+
+    if (await session.execute(cart_item_remove_statement(cart_id, item_id))).first() is None:
+        await session.rollback()
+        raise HTTPException(status_code=404, detail=f"Item {item_id} is not in the cart")
+    await session.commit()
+    return {"detail": f"Item {item_id} removed from the cart"}
+
+
+async def buy_item(user_id: int, item_id: int, session: AsyncSession) -> float:
+    debit, take_from_stock = purchase_statements(user_id, item_id)
+
+    new_balance = (await session.execute(debit)).scalar_one_or_none()
+    if new_balance is None:
+        raise purchase_error(await session.get(User, user_id), await session.get(Item, item_id))
+    if (await session.execute(take_from_stock)).rowcount != 1:
+        raise HTTPException(status_code=400, detail=f"Item {item_id} is out of stock")
+    return new_balance
+
+
+async def user_buy_item(user_id: int, item_id: int, session: AsyncSession) -> dict:
+    try:
+        new_balance = await buy_item(user_id, item_id, session)
+    except HTTPException:
+        await session.rollback()
+        raise
+
+    await session.commit()
+    cache.invalidate(user_cache_key(user_id), item_cache_key(item_id))
+    return purchase_response(new_balance)
+
+
+async def checkout_cart(user_id: int, session: AsyncSession) -> tuple[float, list[int]]:
+    cart_id = (await session.exec(select(UserCartRead.id).where(UserCartRead.user_id == user_id))).first()
+
+    if cart_id is None:
+        if not await session.get(User, user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=404, detail="Cart not found")
+
+    total, has_adult_product, items_found = (await session.exec(cart_totals_statement(cart_id))).one()
+    if not items_found:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+
+    claim_cart, debit, take_from_stock, clear_cart = cart_checkout_statements(
+        user_id, cart_id, total, has_adult_product=bool(has_adult_product)
+    )
+
+    if (await session.execute(claim_cart)).rowcount != 1:
+        raise HTTPException(status_code=404, detail="Cart not found")
+
+    new_balance = (await session.execute(debit)).scalar_one_or_none()
+    if new_balance is None:
+        raise cart_checkout_error(await session.get(User, user_id), total)
+
+    if (await session.execute(take_from_stock)).rowcount != items_found:
+        raise HTTPException(status_code=400, detail="Some items in the cart are out of stock")
+
+    return new_balance, (await session.execute(clear_cart)).scalars().all()
+
+
+async def user_buy_items_for_cart(user_id: int, session: AsyncSession) -> dict:
+    try:
+        new_balance, item_ids = await checkout_cart(user_id, session)
+    except HTTPException:
+        await session.rollback()
+        raise
+
+    await session.commit()
+    cache.invalidate(user_cache_key(user_id), *map(item_cache_key, item_ids))
+
+    return cart_purchase_response(new_balance)
@@ -0,0 +1,156 @@
+"""Async-версии роутов: в async-режиме подключаются поверх синхронных."""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette import status
+
+from core.config import settings
+from core.database import AsyncReadSessionDep, AsyncSessionDep
+from core.etag import conditional, resource_etag
+from core.export import ExportFormat, async_export_chunks, export_response
+from core.profiler import ProfiledRoute
+from users.async_crud import (
+    user_buy_item,
+    user_buy_items_for_cart,
+    user_cart_add_item,
+    user_cart_remove_item,
+    user_create,
+    user_create_cart,
+    user_delete,
+    user_delete_cart,
+    user_read,
+    user_read_all,
+    user_read_cart,
+    user_update,
+    user_with_items_model,
+    users_page_etag,
+    users_with_items,
+)
+from users.crud import users_export_statement
+from users.model import (
+    CartLine,
+    CartRead,
+    UserCartCreate,
+    UserCreate,
+    UserPage,
+    UserRead,
+    UserUpdate,
+    UserWithItems,
+)
+from users.purchase_queue import cart_purchase, item_purchase, purchase_queue
+
+router = APIRouter(prefix="/users", tags=["users"], route_class=ProfiledRoute)
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_users(
+    *, export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson", gzip: bool = False
+) -> StreamingResponse:
+    chunks = async_export_chunks(users_export_statement(), export_format, gzip=gzip)
+    return export_response(chunks, "users", export_format, gzip=gzip)
+
+
+@router.get("/with_items", status_code=status.HTTP_200_OK)
+async def get_users_with_items(
+    ids: Annotated[list[int], Query(min_length=1, max_length=settings.max_page_size)],
+    session: AsyncSessionDep,
+) -> list[UserWithItems]:
+    return await users_with_items(ids, session)
+
+
+@router.get("/{user_id}", status_code=status.HTTP_200_OK)
+async def get_user(user_id: int, session: AsyncReadSessionDep, request: Request, response: Response) -> UserRead:
+    user = await user_read(user_id, session)
+    return conditional(request, response, resource_etag(user.id, user.version)) or user
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_user(user_in: UserCreate, session: AsyncSessionDep) -> UserRead:
+    return await user_create(user_in, session)
+
+
+@router.patch("/{user_id}", status_code=status.HTTP_200_OK)
+async def update_user(user_id: int, user_in: UserUpdate, session: AsyncSessionDep) -> UserRead:
+    return await user_update(user_id, user_in, session)
+
+
+@router.get("/", status_code=status.HTTP_200_OK)
+async def read_all_users(
+    request: Request,
+    response: Response,
+    session: AsyncReadSessionDep,
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = settings.page_size,
+    after: int | None = None,
+) -> UserPage:
+    etag = await users_page_etag(session, limit, after)
+    return conditional(request, response, etag) or await user_read_all(session, limit, after)
+
+
+@router.delete("/{user_id}", status_code=status.HTTP_202_ACCEPTED)
+async def delete_user(user_id: int, session: AsyncSessionDep) -> str:
+    return await user_delete(user_id, session)
+
+
+@router.get("/with_items/{user_id}", status_code=status.HTTP_200_OK)
+async def get_user_with_items_(user_id: int, session: AsyncReadSessionDep) -> UserWithItems:
+    return await user_with_items_model(user_id, session)
+
+
+@router.post("/{user_id}/cart", status_code=status.HTTP_201_CREATED)
+async def create_user_cart(user_cart_in: UserCartCreate, session: AsyncSessionDep) -> CartRead:
+    """
+    создать корзину с товарами для пользоавателя. У пользователя может быть только 1 корзина или не быть ее.
+    корзина содержит ид пользователя и список ид предметов. Создать схему корзина и обновить схему юзер
+    """
+    return await user_create_cart(user_cart_in, session)
+
+
+@router.get("/{user_id}/cart", status_code=status.HTTP_200_OK)
+async def get_user_cart(user_id: int, session: AsyncSessionDep, request: Request, response: Response) -> CartRead:
+    """
+    получить корзину с товарами для пользоавателя.
+    """
+    cart = await user_read_cart(user_id, session)
+    return conditional(request, response, resource_etag(cart.id, cart.version)) or cart
+
+
+@router.delete("/{user_id}/cart", status_code=status.HTTP_202_ACCEPTED)
+async def delete_user_cart(user_id: int, session: AsyncSessionDep) -> dict[str, str]:
+    """
+    удалить корзину с товарами для пользоавателя.
+    """
+    return await user_delete_cart(user_id, session)
+
+
+@router.post("/{user_id}/cart/items/{item_id}", status_code=status.HTTP_201_CREATED)
+async def add_user_cart_item(
+    user_id: int, item_id: int, session: AsyncSessionDep, qty: Annotated[int, Query(ge=1)] = 1
+) -> CartLine:
+    """
+    положить товар в корзину (qty штук, к уже лежащим прибавляется). Корзины нет — она создаётся.
+    """
+    return await user_cart_add_item(user_id, item_id, qty, session)
+
+
+@router.delete("/{user_id}/cart/items/{item_id}", status_code=status.HTTP_202_ACCEPTED)
+async def remove_user_cart_item(user_id: int, item_id: int, session: AsyncSessionDep) -> dict[str, str]:
+    """
+    убрать товар из корзины целиком.
+    """
+    return await user_cart_remove_item(user_id, item_id, session)
+
+
+@router.post("/{user_id}/items", status_code=status.HTTP_201_CREATED)
+async def user_item_buy(user_id: int, item_id: int, session: AsyncSessionDep) -> dict:
+    if settings.purchase_queue_enabled:
+        return await purchase_queue.async_execute(item_purchase(user_id, item_id))
+    return await user_buy_item(user_id, item_id, session)
+
+
+@router.post("/{user_id}/cart/buy", status_code=status.HTTP_202_ACCEPTED)
+async def user_buy_cart_items(user_id: int, session: AsyncSessionDep) -> dict:
+    if settings.purchase_queue_enabled:
+        return await purchase_queue.async_execute(cart_purchase(user_id))
+    return await user_buy_items_for_cart(user_id, session)
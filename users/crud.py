@@ -1,14 +1,31 @@
+from collections import Counter
+from collections.abc import Sequence
+from typing import Any
+
 from fastapi import HTTPException
-from sqlmodel import Session, select
+from sqlalchemy import Delete, Insert, Row, Select, Update, case, delete, insert, literal, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import load_only, selectinload
+from sqlmodel import Session, func, select
 
+from core.bulk import BulkResult, bulk_delete, bulk_insert, bulk_update
+from core.cache import MISSING, cache
 from core.config import settings
-from helper.files import read_json, write_json
+from core.database import begin_write, is_primary, schema_columns
+from core.etag import collection_etag, page_fingerprint_statement
+from items.crud import ITEM_SHORT_COLUMNS, item_cache_key
 from items.model import Item
 from users.model import (
+    CartCheckoutResult,
+    CartItem,
+    CartLine,
+    CartRead,
     User,
+    UserBulkUpdate,
     UserCartCreate,
     UserCartRead,
     UserCreate,
+    UserPage,
     UserRead,
     UserReadShort,
     UserUpdate,
@@ -17,198 +34,510 @@ from users.model import (
 
 ADULT_AGE = settings.adult_age
 
+USER_SHORT_COLUMNS = schema_columns(User, UserReadShort)
+USER_READ_COLUMNS = schema_columns(User, UserRead)
+# в выгрузку пароль не попадает
+USER_EXPORT_COLUMNS = [User.id, *(column for column in USER_READ_COLUMNS if column.key not in {"id", "password"})]
+# ON CONFLICT у каждого диалекта свой; на остальных базах молча собрать чужой SQL нельзя
+CART_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def user_cache_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def user_create_statement(user_in: UserCreate) -> Insert:
+    # RETURNING отдаёт сохранённую строку (с id от базы) тем же запросом, что её вставил
+    return insert(User).values(**user_in.model_dump()).returning(*USER_READ_COLUMNS)
 
-def _load_users() -> dict[int, dict]:
-    db = read_json()
-    users = db.get("users", {})
-    return {int(k): v for k, v in users.items()}
 
+def user_update_statement(user_id: int, user_in: UserUpdate) -> Update:
+    # пустой результат — пользователя нет, отдельный SELECT перед UPDATE не нужен
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(**user_in.model_dump(exclude_unset=True), version=User.version + 1)
+        .returning(*USER_READ_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
 
-def _save_users(users: dict[int, dict]):
-    db = read_json()
-    db["users"] = {str(k): v for k, v in users.items()}
-    write_json(db)
+
+def user_delete_statement(user_id: int) -> Delete:
+    return delete(User).where(User.id == user_id).returning(User.id).execution_options(synchronize_session=False)
+
+
+def user_create(user_in: UserCreate, session: Session) -> UserRead:
+    row = session.execute(user_create_statement(user_in)).one()
+    session.commit()
+    return UserRead.model_validate(row, from_attributes=True)
 
 
-def _load_cart() -> dict[int, dict]:
-    db = read_json()
-    cart = db.get("cart", {})
-    return {int(k): v for k, v in cart.items()}
+def users_create_bulk(rows: list[Any], session: Session) -> BulkResult:
+    return bulk_insert(session, User, UserCreate, rows)
 
 
-def _save_cart(cart: dict[int, dict]):
-    db = read_json()
-    db["cart"] = {str(k): v for k, v in cart.items()}
-    write_json(db)
+def users_update_bulk(rows: list[Any], session: Session) -> BulkResult:
+    result = bulk_update(session, User, UserBulkUpdate, rows)
+    cache.invalidate(*map(user_cache_key, result.ids))
+    return result
 
 
-def user_create(user_in: UserCreate, session: Session) -> UserCreate:
-    user = User(**user_in.model_dump())
-    session.add(user)  # Добавляем в сессию
-    session.commit()  # Сохраняем в файл .db
-    session.refresh(user)  # Получаем ID от базы
-    return user_in
+def users_delete_bulk(user_ids: list[int], session: Session) -> BulkResult:
+    result = bulk_delete(session, User, user_ids)
+    cache.invalidate(*map(user_cache_key, result.ids))
+    return result
 
 
-def user_read_all(session: Session) -> list[UserReadShort]:
-    users = session.exec(select(User)).all()
-    return [UserReadShort(**user.model_dump()) for user in users]
+def user_read_all(session: Session, limit: int = settings.page_size, after: int | None = None) -> UserPage:
+    # keyset-пагинация: следующая страница начинается после последнего id предыдущей
+    statement = select(*USER_SHORT_COLUMNS).order_by(User.id).limit(limit + 1)
+    if after is not None:
+        statement = statement.where(User.id > after)
+
+    rows = session.exec(statement).all()
+    users = [UserReadShort.model_construct(**row._mapping) for row in rows[:limit]]
+    next_cursor = users[-1].id if len(rows) > limit else None
+    return UserPage.model_construct(users=users, next_cursor=next_cursor)
+
+
+def users_export_statement() -> Select:
+    return select(*USER_EXPORT_COLUMNS).order_by(User.id)
+
+
+def users_page_etag(session: Session, limit: int = settings.page_size, after: int | None = None) -> str:
+    return collection_etag(session.exec(page_fingerprint_statement(User, limit, after)).one())
 
 
 def user_read(user_id: int, session: Session) -> UserRead:
-    user = session.get(User, user_id)
-    if not user:
+    cached = cache.get(user_cache_key(user_id))
+    if cached is not MISSING:
+        return cached
+
+    row = session.exec(select(*USER_READ_COLUMNS).where(User.id == user_id)).first()
+    if not row:
         msg = f"user {user_id} is not found."
         raise HTTPException(status_code=404, detail=msg)
-    return UserRead(**user.model_dump())
 
+    # balance в таблице float, а в схеме int — здесь нужна валидация, а не model_construct
+    user_out = UserRead.model_validate(row, from_attributes=True)
+    if is_primary(session):
+        cache.set(user_cache_key(user_id), user_out)
+    return user_out
 
-def user_update(user_id: int, user_in: UserUpdate, session: Session) -> User:
-    user: User | None = session.get(User, user_id)
-    if not user:
-        msg = f"user {user_id} is not found."
-        raise HTTPException(status_code=404, detail=msg)
 
-    update_data = user_in.model_dump(exclude_unset=True)
+def users_warm_cache(session: Session, limit: int) -> int:
+    rows = session.exec(select(*USER_READ_COLUMNS).order_by(User.id).limit(limit)).all()
+    for row in rows:
+        cache.set(user_cache_key(row.id), UserRead.model_validate(row, from_attributes=True))
+    return len(rows)
+
 
-    user.sqlmodel_update(update_data)
-    session.add(user)
+def user_update(user_id: int, user_in: UserUpdate, session: Session) -> UserRead:
+    row = session.execute(user_update_statement(user_id, user_in)).first()
+    if row is None:
+        msg = f"user {user_id} is not found."
+        raise HTTPException(status_code=404, detail=msg)
     session.commit()
-    session.refresh(user)
-    return user
+    cache.invalidate(user_cache_key(user_id))
+    return UserRead.model_validate(row, from_attributes=True)
 
 
 def user_delete(user_id: int, session: Session) -> str:
-    user = session.get(User, user_id)
-
-    if not user:
+    if session.execute(user_delete_statement(user_id)).first() is None:
         msg = f"user {user_id} is not found."
         raise HTTPException(status_code=404, detail=msg)
-    session.delete(user)
     session.commit()
+    cache.invalidate(user_cache_key(user_id))
     return f"Пользователь с id {user_id} удален"
 
 
+def users_with_items_statement(user_ids: list[int]) -> Select:
+    # два запроса на любое число пользователей: сами пользователи и товары всех их одним IN
+    return (
+        select(User)
+        .where(User.id.in_(user_ids))
+        .order_by(User.id)
+        .options(load_only(*USER_SHORT_COLUMNS), selectinload(User.items).load_only(*ITEM_SHORT_COLUMNS))
+    )
+
+
+def users_with_items(user_ids: list[int], session: Session) -> list[UserWithItems]:
+    users = session.exec(users_with_items_statement(user_ids)).all()
+    return [UserWithItems.model_validate(user, from_attributes=True) for user in users]
+
+
 def user_with_items_model(user_id: int, session: Session) -> UserWithItems:
-    users = session.get(User, user_id)
+    users = users_with_items([user_id], session)
     if not users:
         msg = f"user {user_id} is not found."
         raise HTTPException(status_code=404, detail=msg)
-
-    statement = select(Item).where(Item.owner_id == user_id)
-    items = session.exec(statement).all()
-    user_data = users.model_dump()
-    user_data["items"] = items
-    return UserWithItems(**user_data)
+    return users[0]
+
+
+def cart_create_statement(user_id: int) -> Insert:
+    # id удалённой корзины может достаться новой — версия продолжает счётчик пользователя, чтобы ETag не совпал
+    user_version = select(User.version + 1).where(User.id == user_id).scalar_subquery()
+    return (
+        insert(UserCartRead)
+        .values(user_id=user_id, version=func.coalesce(user_version, 1))
+        .returning(UserCartRead.id, UserCartRead.user_id, UserCartRead.version)
+    )
+
+
+def cart_delete_statement(user_id: int) -> Delete:
+    return (
+        delete(UserCartRead)
+        .where(UserCartRead.user_id == user_id)
+        .returning(UserCartRead.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def cart_link_statement(user_id: int, cart_id: int | None) -> Update:
+    # привязать корзину можно, только если у пользователя её ещё нет (1 юзер = 1 корзина); отвязать — всегда
+    statement = update(User).where(User.id == user_id)
+    if cart_id is not None:
+        statement = statement.where(User.cart_id.is_(None))
+    return (
+        statement.values(cart_id=cart_id, version=User.version + 1)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def cart_touch_statement(user_id: int) -> Update:
+    # любая правка строк корзины меняет её версию (ETag); UPDATE заодно блокирует корзину до конца транзакции
+    return (
+        update(UserCartRead)
+        .where(UserCartRead.user_id == user_id)
+        .values(version=UserCartRead.version + 1)
+        .returning(UserCartRead.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def cart_lines(item_ids: list[int] | None) -> list[CartLine]:
+    # повтор id в списке — ещё одна штука того же товара
+    return [CartLine(item_id=item_id, qty=qty) for item_id, qty in sorted(Counter(item_ids or ()).items())]
+
+
+def cart_items_exist_statement(lines: list[CartLine]) -> Select:
+    return select(Item.id).where(Item.id.in_([line.item_id for line in lines]))
+
+
+def cart_items_missing_error(lines: list[CartLine], existing: Sequence[int]) -> HTTPException | None:
+    missing = sorted({line.item_id for line in lines} - set(existing))
+    if missing:
+        return HTTPException(status_code=404, detail=f"Items {missing} not found")
+    return None
+
+
+def cart_item_add_statement(cart_id: int, item_id: int, qty: int, dialect: str) -> Insert:
+    # INSERT ... SELECT из item: несуществующий товар не вставится и RETURNING будет пустым;
+    # строка уже есть — ON CONFLICT прибавляет количество тем же запросом
+    upsert = CART_UPSERT_INSERTS.get(dialect)
+    if upsert is None:
+        msg = f"Cart upsert is not supported for the {dialect} dialect"
+        raise NotImplementedError(msg)
+    statement = upsert(CartItem).from_select(
+        ["cart_id", "item_id", "qty"],
+        select(literal(cart_id), Item.id, literal(qty)).where(Item.id == item_id),
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[CartItem.cart_id, CartItem.item_id],
+        set_={"qty": CartItem.qty + statement.excluded.qty},
+    ).returning(CartItem.item_id, CartItem.qty)
+
+
+def cart_item_remove_statement(cart_id: int, item_id: int) -> Delete:
+    return (
+        delete(CartItem)
+        .where(CartItem.cart_id == cart_id, CartItem.item_id == item_id)
+        .returning(CartItem.item_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def cart_items_delete_statement(cart_id: int) -> Delete:
+    return (
+        delete(CartItem)
+        .where(CartItem.cart_id == cart_id)
+        .returning(CartItem.item_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def cart_read_statement(user_id: int) -> Select:
+    # корзина и все её строки одним запросом; у пустой корзины одна строка с NULL вместо товара
+    return (
+        select(UserCartRead.id, UserCartRead.user_id, UserCartRead.version, CartItem.item_id, CartItem.qty)
+        .outerjoin(CartItem, CartItem.cart_id == UserCartRead.id)
+        .where(UserCartRead.user_id == user_id)
+        .order_by(CartItem.item_id)
+    )
+
+
+def cart_from_rows(rows: Sequence[Row]) -> CartRead:
+    if not rows:
+        raise HTTPException(status_code=404, detail="Cart not found")
+    items = [CartLine.model_construct(item_id=row.item_id, qty=row.qty) for row in rows if row.item_id is not None]
+    return CartRead.model_construct(id=rows[0].id, user_id=rows[0].user_id, version=rows[0].version, items=items)
 
 
-def user_create_cart(cart_in: UserCartCreate, session: Session) -> UserCartRead:
-    # 1. Проверяем, существует ли пользователь
-    user = session.get(User, cart_in.user_id)
+def cart_create_error(user: User | None, user_id: int) -> HTTPException:
+    # Причину отказа выясняем только после неудачной привязки
     if not user:
-        raise HTTPException(status_code=404, detail=f"User {cart_in.user_id} not found")
+        return HTTPException(status_code=404, detail=f"User {user_id} not found")
+    return HTTPException(status_code=400, detail="User already has a cart")
 
-    # 2. Проверяем, нет ли у него уже корзины (логика: 1 юзер = 1 корзина)
-    statement = select(UserCartRead).where(UserCartRead.user_id == cart_in.user_id)
-    cart = session.exec(statement).first()
-    if cart:
-        raise HTTPException(status_code=400, detail="User already has a cart")
 
-    # 3. Создаем корзину
-    db_cart = UserCartRead.model_validate(cart_in)
-    session.add(db_cart)
-    session.commit()
-    session.refresh(db_cart)
-
-    # 4. Опционально: обновляем поле cart_id в таблице User
-    user.cart_id = db_cart.id
-    session.add(user)
-    session.commit()
+def cart_create(user_id: int, session: Session) -> Row:
+    """Создаёт корзину и привязывает её к пользователю без commit."""
+    cart = session.execute(cart_create_statement(user_id)).one()
+    if session.execute(cart_link_statement(user_id, cart.id)).first() is None:
+        session.rollback()
+        raise cart_create_error(session.get(User, user_id), user_id)
+    return cart
 
-    return db_cart
 
+def user_create_cart(cart_in: UserCartCreate, session: Session) -> CartRead:
+    lines = cart_lines(cart_in.item_ids)
+    if lines and (error := cart_items_missing_error(lines, session.exec(cart_items_exist_statement(lines)).all())):
+        raise error
+    cart = cart_create(cart_in.user_id, session)
+    if lines:
+        session.execute(insert(CartItem), [{"cart_id": cart.id, **line.model_dump()} for line in lines])
+    session.commit()
+    cache.invalidate(user_cache_key(cart_in.user_id))
+    return CartRead.model_construct(**cart._mapping, items=lines)
 
-def user_read_cart(user_id: int, session: Session) -> UserCartRead:
-    # Ищем в таблице Cart строку, где user_id совпадает
-    statement = select(UserCartRead).where(UserCartRead.user_id == user_id)
-    cart = session.exec(statement).first()
 
-    if not cart:
-        raise HTTPException(status_code=404, detail="Cart not found")
-    return cart
+def user_read_cart(user_id: int, session: Session) -> CartRead:
+    return cart_from_rows(session.execute(cart_read_statement(user_id)).all())
 
 
 def user_delete_cart(user_id: int, session: Session) -> dict[str, str]:
-    statement = select(UserCartRead).where(UserCartRead.user_id == user_id)
-    cart = session.exec(statement).first()
-    if not cart:
+    cart_id = session.execute(cart_delete_statement(user_id)).scalar_one_or_none()
+    if cart_id is None:
         raise HTTPException(status_code=404, detail="Cart not found")
+    session.execute(cart_items_delete_statement(cart_id))
+    session.execute(cart_link_statement(user_id, None))
+    session.commit()
+    cache.invalidate(user_cache_key(user_id))
 
-    user = session.get(User, user_id)
-    if user:
-        user.cart_id = None
-        session.add(user)
+    return {"detail": f"Cart for user {user_id} successfully deleted"}
 
-    session.delete(cart)
 
-    session.commit()
+def user_cart_add_item(user_id: int, item_id: int, qty: int, session: Session) -> CartLine:
+    # корзины ещё нет — первая добавленная позиция её создаёт
+    cart_id = session.execute(cart_touch_statement(user_id)).scalar_one_or_none()
+    if cart_id is None:
+        cart_id = cart_create(user_id, session).id
+        # привязка корзины меняет пользователя (cart_id, version)
+        cache.invalidate(user_cache_key(user_id))
 
-    return {"detail": f"Cart for user {user_id} successfully deleted"}
+    line = session.execute(cart_item_add_statement(cart_id, item_id, qty, session.bind.dialect.name)).first()
+    if line is None:
+        session.rollback()
+        raise HTTPException(status_code=404, detail=f"Item {item_id} not found")
+    session.commit()
+    return CartLine.model_construct(**line._mapping)
 
 
-def user_buy_item(user_id: int, item_id: int, session: Session) -> dict:
-    user = session.get(User, user_id)
-    item = session.get(Item, item_id)
+def user_cart_remove_item(user_id: int, item_id: int, session: Session) -> dict[str, str]:
+    cart_id = session.execute(cart_touch_statement(user_id)).scalar_one_or_none()
+    if cart_id is None:
+        raise HTTPException(status_code=404, detail="Cart not found")
 
+    if session.execute(cart_item_remove_statement(cart_id, item_id)).first() is None:
+        session.rollback()
+        raise HTTPException(status_code=404, detail=f"Item {item_id} is not in the cart")
+    session.commit()
+    return {"detail": f"Item {item_id} removed from the cart"}
+
+
+def purchase_statements(user_id: int, item_id: int) -> tuple[Update, Update]:
+    # Все проверки — в условиях UPDATE: если строка не обновилась, покупка не прошла
+    price = select(Item.price).where(Item.id == item_id).scalar_subquery()
+    adult_product = select(Item.adult_product).where(Item.id == item_id).scalar_subquery()
+
+    debit = (
+        update(User)
+        .where(User.id == user_id, User.balance >= price, or_(User.age >= ADULT_AGE, adult_product == False))
+        .values(balance=User.balance - price, version=User.version + 1)
+        .returning(User.balance)
+        .execution_options(synchronize_session=False)
+    )
+    take_from_stock = (
+        update(Item)
+        .where(Item.id == item_id, Item.quantity_in_stock > 0)
+        .values(quantity_in_stock=Item.quantity_in_stock - 1, version=Item.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return debit, take_from_stock
+
+
+def purchase_error(user: User | None, item: Item | None) -> HTTPException:
+    # Причину отказа выясняем только после неудачной покупки
     if not user or not item:
-        raise HTTPException(status_code=404, detail="User or Item not found")
+        return HTTPException(status_code=404, detail="User or Item not found")
 
     if user.balance < item.price:
-        raise HTTPException(status_code=400, detail=f"Недостаточно средств. Нужно: {item.price}, у вас: {user.balance}")
+        msg = f"Недостаточно средств. Нужно: {item.price}, у вас: {user.balance}"
+        return HTTPException(status_code=400, detail=msg)
 
     if item.adult_product and user.age < ADULT_AGE:
-        raise HTTPException(status_code=400, detail=f"You are not yet {ADULT_AGE} years old")
+        return HTTPException(status_code=400, detail=f"You are not yet {ADULT_AGE} years old")
 
-    user.balance -= item.price
+    return HTTPException(status_code=400, detail=f"Item {item.id} is out of stock")
 
-    session.add(user)
-    session.commit()
-    session.refresh(user)
-    return {"message": "Покупка успешна", "new_balance": user.balance}
 
+def purchase_response(new_balance: float) -> dict:
+    return {"message": "Покупка успешна", "new_balance": new_balance}
 
-def user_buy_items_for_cart(user_id: int, session: Session) -> dict:  # Поменял на dict для удобства
-    statement = select(UserCartRead).where(UserCartRead.user_id == user_id)
-    cart = session.exec(statement).first()
-    user = session.get(User, user_id)
 
+def buy_item(user_id: int, item_id: int, session: Session) -> float:
+    """Покупает товар без commit: возвращает новый баланс. При ошибке транзакцию откатывает вызывающий."""
+    debit, take_from_stock = purchase_statements(user_id, item_id)
+
+    new_balance = session.execute(debit).scalar_one_or_none()
+    if new_balance is None:
+        # списания не было — причину видно по текущим строкам
+        raise purchase_error(session.get(User, user_id), session.get(Item, item_id))
+    if session.execute(take_from_stock).rowcount != 1:
+        # деньги списались, значит и пользователь, и товар есть — товара нет на складе
+        raise HTTPException(status_code=400, detail=f"Item {item_id} is out of stock")
+    return new_balance
+
+
+def user_buy_item(user_id: int, item_id: int, session: Session) -> dict:
+    try:
+        new_balance = buy_item(user_id, item_id, session)
+    except HTTPException:
+        session.rollback()
+        raise
+
+    session.commit()
+    cache.invalidate(user_cache_key(user_id), item_cache_key(item_id))
+    return purchase_response(new_balance)
+
+
+def cart_totals_statement(cart_id: int) -> Select:
+    # сумма, признак товара 18+ и число найденных товаров — одним агрегатным запросом по join строк корзины с item
+    return (
+        select(
+            func.coalesce(func.sum(Item.price * CartItem.qty), 0),
+            func.coalesce(func.max(case((Item.adult_product, 1), else_=0)), 0),
+            func.count(Item.id),
+        )
+        .select_from(CartItem)
+        .join(Item, Item.id == CartItem.item_id)
+        .where(CartItem.cart_id == cart_id)
+    )
+
+
+def cart_checkout_statements(
+    user_id: int, cart_id: int, total: int, *, has_adult_product: bool
+) -> tuple[Delete, Update, Update, Delete]:
+    claim_cart = delete(UserCartRead).where(UserCartRead.id == cart_id).execution_options(synchronize_session=False)
+
+    conditions = [User.id == user_id, User.balance >= total]
+    if has_adult_product:
+        conditions.append(User.age >= ADULT_AGE)
+    debit = (
+        update(User)
+        .where(*conditions)
+        .values(balance=User.balance - total, cart_id=None, version=User.version + 1)
+        .returning(User.balance)
+        .execution_options(synchronize_session=False)
+    )
+
+    # количество строки корзины — коррелированным подзапросом по первичному ключу (cart_id, item_id)
+    qty = select(CartItem.qty).where(CartItem.cart_id == cart_id, CartItem.item_id == Item.id).scalar_subquery()
+    take_from_stock = (
+        update(Item)
+        .where(Item.id.in_(select(CartItem.item_id).where(CartItem.cart_id == cart_id)), Item.quantity_in_stock >= qty)
+        .values(quantity_in_stock=Item.quantity_in_stock - qty, version=Item.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return claim_cart, debit, take_from_stock, cart_items_delete_statement(cart_id)
+
+
+def cart_checkout_error(user: User | None, total: int) -> HTTPException:
     if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+        return HTTPException(status_code=404, detail="User not found")
+
+    if user.balance < total:
+        return HTTPException(status_code=400, detail=f"Low balance: {total}, you have: {user.balance}")
+
+    return HTTPException(status_code=400, detail=f"You are not yet {ADULT_AGE} years old")
+
 
-    if not cart:
+def checkout_cart(user_id: int, session: Session) -> tuple[float, list[int]]:
+    """Оплачивает корзину без commit: возвращает новый баланс и id купленных товаров."""
+    cart_id = session.exec(select(UserCartRead.id).where(UserCartRead.user_id == user_id)).first()
+
+    if cart_id is None:
+        if not session.get(User, user_id):
+            raise HTTPException(status_code=404, detail="User not found")
         raise HTTPException(status_code=404, detail="Cart not found")
 
-    if not cart.item_ids:
+    total, has_adult_product, items_found = session.exec(cart_totals_statement(cart_id)).one()
+    if not items_found:
         raise HTTPException(status_code=400, detail="Cart is empty")
 
-    items_statement = select(Item).where(Item.id.in_(cart.item_ids))
-    items = session.exec(items_statement).all()
+    claim_cart, debit, take_from_stock, clear_cart = cart_checkout_statements(
+        user_id, cart_id, total, has_adult_product=bool(has_adult_product)
+    )
+
+    # удаление корзины "забирает" её: параллельная оплата той же корзины сюда не дойдёт
+    if session.execute(claim_cart).rowcount != 1:
+        raise HTTPException(status_code=404, detail="Cart not found")
+
+    new_balance = session.execute(debit).scalar_one_or_none()
+    if new_balance is None:
+        raise cart_checkout_error(session.get(User, user_id), total)
 
-    total_price = sum(item.price for item in items)
+    if session.execute(take_from_stock).rowcount != items_found:
+        raise HTTPException(status_code=400, detail="Some items in the cart are out of stock")
 
-    if user.balance < total_price:
-        raise HTTPException(status_code=400, detail=f"Low balance: {total_price}, you have: {user.balance}")
+    return new_balance, session.execute(clear_cart).scalars().all()
 
-    for item in items:
-        if item.adult_product and user.age < ADULT_AGE:
-            raise HTTPException(status_code=400, detail=f"You are not yet {ADULT_AGE} years old")
 
-    user.balance -= total_price
+def cart_purchase_response(new_balance: float) -> dict:
+    return {"admin say": "order complete", "You new balance": new_balance}
+
+
+def user_buy_items_for_cart(user_id: int, session: Session) -> dict:  # Поменял на dict для удобства
+    try:
+        new_balance, item_ids = checkout_cart(user_id, session)
+    except HTTPException:
+        session.rollback()
+        raise
 
-    session.add(user)
-    session.delete(cart)
     session.commit()
+    cache.invalidate(user_cache_key(user_id), *map(item_cache_key, item_ids))
+
+    return cart_purchase_response(new_balance)
 
-    session.refresh(user)
 
-    return {"admin say": "order complete", "You new balance": user.balance}
+def users_checkout_carts(user_ids: list[int], session: Session) -> list[CartCheckoutResult]:
+    # Все корзины — в одной транзакции; каждая оплата в своём SAVEPOINT, ошибка одной не мешает другим
+    begin_write(session)
+
+    results = []
+    invalidated = []
+    for user_id in dict.fromkeys(user_ids):
+        try:
+            with session.begin_nested():
+                new_balance, item_ids = checkout_cart(user_id, session)
+        except HTTPException as error:
+            results.append(CartCheckoutResult(user_id=user_id, ok=False, detail=error.detail))
+            continue
+
+        results.append(CartCheckoutResult(user_id=user_id, ok=True, new_balance=new_balance))
+        invalidated += [user_cache_key(user_id), *map(item_cache_key, item_ids)]
+
+    session.commit()
+    cache.invalidate(*invalidated)
+    return results
@@ -0,0 +1,31 @@
+"""Перенос данных между схемами при старте, после create_all и досоздания колонок."""
+
+import logging
+from collections import Counter
+
+from sqlalchemy import Connection, insert, null, select, update
+
+from users.model import CartItem, UserCartRead
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_cart_item_ids(connection: Connection) -> int:
+    # JSON-список item_ids -> строки CartItem; после переноса список обнуляется, повторный запуск ничего не делает
+    carts = connection.execute(
+        select(UserCartRead.id, UserCartRead.item_ids).where(UserCartRead.item_ids.is_not(None)),
+    ).all()
+    lines = [
+        {"cart_id": cart_id, "item_id": item_id, "qty": qty}
+        for cart_id, item_ids in carts
+        for item_id, qty in Counter(item_ids or ()).items()
+    ]
+    if lines:
+        connection.execute(insert(CartItem), lines)
+    if carts:
+        connection.execute(
+            # null() — SQL NULL; None колонка JSON записала бы как JSON-значение 'null'
+            update(UserCartRead).where(UserCartRead.id.in_([cart_id for cart_id, _ in carts])).values(item_ids=null()),
+        )
+        logger.info("Корзины перенесены в cartitem: %d корзин, %d строк", len(carts), len(lines))
+    return len(carts)
@@ -1,29 +1,36 @@
 from pydantic import EmailStr
 from sqlalchemy import JSON, Column
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, Relationship, SQLModel
 
-from items.model import ItemReadShort
+from core.model import Versioned
+from items.model import Item, ItemReadShort
 
 
 class UserBase(SQLModel):
     first_name: str
     last_name: str
-    email: EmailStr
+    email: EmailStr = Field(index=True)
     age: int
     password: str | None = Field(None, min_length=6, max_length=25)
     sex: str
 
 
 # 2) покупать вещи, с добавлением items  и отниманием денег в балансе
-class User(UserBase, table=True):
+class User(UserBase, Versioned, table=True):
     id: int | None = Field(default=None, primary_key=True)
     cart_id: int | None = None
     balance: float = Field(default=0.0)
 
+    # у item.owner_id нет внешнего ключа, поэтому условие связи задано явно, и связь только на чтение
+    items: list[Item] = Relationship(
+        sa_relationship_kwargs={"primaryjoin": "User.id == foreign(Item.owner_id)", "viewonly": True},
+    )
+
 
 class UserRead(UserBase):
     id: int
     balance: int
+    version: int
 
 
 class UserCreate(UserBase):
@@ -40,6 +47,10 @@ class UserUpdate(SQLModel):
     balance: int | None = None
 
 
+class UserBulkUpdate(UserUpdate):
+    id: int
+
+
 class UserReadShort(SQLModel):
     id: int
     first_name: str
@@ -47,19 +58,51 @@ class UserReadShort(SQLModel):
     email: EmailStr
 
 
+class UserPage(SQLModel):
+    users: list[UserReadShort]
+    next_cursor: int | None = None
+
+
 class UserWithItems(UserReadShort):
     items: list[ItemReadShort]
 
 
 class UserCart(SQLModel):
-    user_id: int
-    item_ids: list[int] | None = Field(default=None, sa_column=Column(JSON))
+    user_id: int = Field(index=True)
 
 
 class UserCartCreate(UserCart):
-    pass
+    # повтор id — ещё одна штука того же товара
+    item_ids: list[int] | None = None
 
 
 # Добавляем table=True и первичный ключ
-class UserCartRead(UserCart, table=True):
+class UserCartRead(UserCart, Versioned, table=True):
     id: int | None = Field(default=None, primary_key=True)
+    # раньше товары корзины хранились здесь списком; при старте они переносятся в CartItem, колонка больше не пишется
+    item_ids: list[int] | None = Field(default=None, sa_column=Column(JSON))
+
+
+class CartItem(SQLModel, table=True):
+    # строка корзины; первичный ключ (cart_id, item_id) сразу индексирует корзину
+    cart_id: int = Field(primary_key=True)
+    item_id: int = Field(primary_key=True, index=True)
+    qty: int = Field(default=1)
+
+
+class CartLine(SQLModel):
+    item_id: int
+    qty: int
+
+
+class CartRead(UserCart):
+    id: int
+    version: int
+    items: list[CartLine] = []
+
+
+class CartCheckoutResult(SQLModel):
+    user_id: int
+    ok: bool
+    new_balance: float | None = None
+    detail: str | None = None
@@ -0,0 +1,158 @@
+"""Групповой commit покупок (POST /users/{user_id}/items и /users/{user_id}/cart/buy).
+
+При purchase_queue_enabled покупка не открывает свою транзакцию, а встаёт в очередь. Поток-писатель
+забирает пачку — до purchase_batch_size покупок или сколько успело прийти за purchase_batch_wait_ms —
+и проводит её одной транзакцией: каждая покупка в своём SAVEPOINT, в конце один commit.
+Ошибка покупки (любая, не только HTTPException) откатывает только её SAVEPOINT. Результат или ошибку
+каждый запрос получает через свой Future после commit пачки. На SQLite это один захват блокировки
+записи и один fsync на пачку вместо одного на покупку.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from core.cache import cache
+from core.config import settings
+from core.database import begin_write, engine
+from items.crud import item_cache_key
+from users.crud import buy_item, cart_purchase_response, checkout_cart, purchase_response, user_cache_key
+
+logger = logging.getLogger(__name__)
+
+# покупка без commit: возвращает ответ и ключи кэша, которые надо сбросить после commit
+Purchase = Callable[[Session], tuple[dict, list[str]]]
+
+
+def item_purchase(user_id: int, item_id: int) -> Purchase:
+    def purchase(session: Session) -> tuple[dict, list[str]]:
+        new_balance = buy_item(user_id, item_id, session)
+        return purchase_response(new_balance), [user_cache_key(user_id), item_cache_key(item_id)]
+
+    return purchase
+
+
+def cart_purchase(user_id: int) -> Purchase:
+    def purchase(session: Session) -> tuple[dict, list[str]]:
+        new_balance, item_ids = checkout_cart(user_id, session)
+        return cart_purchase_response(new_balance), [user_cache_key(user_id), *map(item_cache_key, item_ids)]
+
+    return purchase
+
+
+class PurchaseQueue:
+    def __init__(self, batch_size: int, batch_wait_ms: float):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        # None в очереди — сигнал писателю остановиться
+        self._queue: queue.SimpleQueue[tuple[Purchase, Future] | None] = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and self._writer.is_alive()
+
+    def start(self):
+        # повторный start не заводит второго писателя: stop ставит в очередь один сигнал и ждёт один поток
+        with self._lock:
+            if self.running:
+                return
+            self._writer = threading.Thread(target=self._run, name="purchase-writer", daemon=True)
+            self._writer.start()
+
+    def stop(self):
+        # покупки, которые уже в очереди, писатель успеет провести
+        with self._lock:
+            if self._writer is None:
+                return
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def submit(self, purchase: Purchase) -> Future:
+        if self._writer is None:
+            msg = "purchase queue is not started"
+            raise RuntimeError(msg)
+        future = Future()
+        self._queue.put((purchase, future))
+        return future
+
+    def execute(self, purchase: Purchase) -> dict:
+        return self.submit(purchase).result()
+
+    async def async_execute(self, purchase: Purchase) -> dict:
+        return await asyncio.wrap_future(self.submit(purchase))
+
+    def _next_batch(self) -> list[tuple[Purchase, Future]] | None:
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if entry is None:
+                # сначала проводим собранную пачку, остановка — следующим шагом
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            try:
+                self._apply(batch)
+            except Exception as error:
+                # упал сам commit (или соединение) — не прошла ни одна покупка пачки
+                logger.exception("Purchase batch of %d failed", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _apply(self, batch: list[tuple[Purchase, Future]]):
+        outcomes: list[tuple[Future, dict | None, Exception | None]] = []
+        invalidated: list[str] = []
+        with Session(engine) as session:
+            begin_write(session)
+            for purchase, future in batch:
+                try:
+                    with session.begin_nested():
+                        response, keys = purchase(session)
+                except HTTPException as error:
+                    outcomes.append((future, None, error))
+                    continue
+                except Exception as error:
+                    # сбой одной покупки (ошибка в данных, ограничение в базе) не роняет остальные в пачке
+                    logger.exception("Purchase failed, rolled back to its savepoint")
+                    outcomes.append((future, None, error))
+                    continue
+                outcomes.append((future, response, None))
+                invalidated += keys
+            session.commit()
+
+        cache.invalidate(*invalidated)
+        # ответы отдаём только после commit: успешная покупка уже записана
+        for future, response, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(response)
+        logger.debug("Purchase batch: %d purchases", len(batch))
+
+
+purchase_queue = PurchaseQueue(settings.purchase_batch_size, settings.purchase_batch_wait_ms)
@@ -1,10 +1,20 @@
-from fastapi import APIRouter
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from starlette import status
 
-from core.database import SessionDep
+from core.bulk import BulkResult
+from core.config import settings
+from core.database import ReadSessionDep, SessionDep
+from core.etag import conditional, resource_etag
+from core.export import ExportFormat, export_chunks, export_response
+from core.profiler import ProfiledRoute
 from users.crud import (
     user_buy_item,
     user_buy_items_for_cart,
+    user_cart_add_item,
+    user_cart_remove_item,
     user_create,
     user_create_cart,
     user_delete,
@@ -14,40 +24,108 @@ from users.crud import (
     user_read_cart,
     user_update,
     user_with_items_model,
+    users_checkout_carts,
+    users_create_bulk,
+    users_delete_bulk,
+    users_export_statement,
+    users_page_etag,
+    users_update_bulk,
+    users_with_items,
 )
 from users.model import (
-    User,
-    UserCart,
+    CartCheckoutResult,
+    CartLine,
+    CartRead,
     UserCartCreate,
-    UserCartRead,
     UserCreate,
+    UserPage,
     UserRead,
-    UserReadShort,
     UserUpdate,
     UserWithItems,
 )
+from users.purchase_queue import cart_purchase, item_purchase, purchase_queue
+
+router = APIRouter(prefix="/users", tags=["users"], route_class=ProfiledRoute)
+
+
+# bulk-роуты и /with_items объявлены раньше /{user_id}, иначе "bulk" попадёт в user_id
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+def create_users_bulk(rows: list[Any], session: SessionDep) -> BulkResult:
+    """
+    строки в формате UserCreate: каждая валидируется отдельно, невалидные попадают в errors со своим индексом.
+    """
+    return users_create_bulk(rows, session)
+
+
+@router.patch("/bulk", status_code=status.HTTP_200_OK)
+def update_users_bulk(rows: list[Any], session: SessionDep) -> BulkResult:
+    """
+    строки в формате UserBulkUpdate: каждая валидируется отдельно, невалидные попадают в errors со своим индексом.
+    """
+    return users_update_bulk(rows, session)
+
+
+@router.delete("/bulk", status_code=status.HTTP_202_ACCEPTED)
+def delete_users_bulk(user_ids: list[int], session: SessionDep) -> BulkResult:
+    return users_delete_bulk(user_ids, session)
 
-router = APIRouter(prefix="/users", tags=["users"])
+
+@router.post("/carts/checkout", status_code=status.HTTP_202_ACCEPTED)
+def checkout_carts(user_ids: list[int], session: SessionDep) -> list[CartCheckoutResult]:
+    """
+    оплатить корзины нескольких пользователей одной транзакцией (ночная выгрузка заказов).
+    """
+    return users_checkout_carts(user_ids, session)
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+def export_users(
+    *, export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson", gzip: bool = False
+) -> StreamingResponse:
+    """
+    потоковая выгрузка всех пользователей (без паролей) в NDJSON или CSV, gzip=true сжимает поток.
+    """
+    chunks = export_chunks(users_export_statement(), export_format, gzip=gzip)
+    return export_response(chunks, "users", export_format, gzip=gzip)
+
+
+@router.get("/with_items", status_code=status.HTTP_200_OK)
+def get_users_with_items(
+    ids: Annotated[list[int], Query(min_length=1, max_length=settings.max_page_size)],
+    session: SessionDep,
+) -> list[UserWithItems]:
+    """
+    пользователи с их товарами за постоянное число запросов (страница админки).
+    """
+    return users_with_items(ids, session)
 
 
 @router.get("/{user_id}", status_code=status.HTTP_200_OK)
-def get_user(user_id: int, session: SessionDep) -> UserRead:
-    return user_read(user_id, session)
+def get_user(user_id: int, session: ReadSessionDep, request: Request, response: Response) -> UserRead:
+    user = user_read(user_id, session)
+    return conditional(request, response, resource_etag(user.id, user.version)) or user
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-def create_user(user_in: UserCreate, session: SessionDep) -> UserCreate:
+def create_user(user_in: UserCreate, session: SessionDep) -> UserRead:
     return user_create(user_in, session)
 
 
 @router.patch("/{user_id}", status_code=status.HTTP_200_OK)
-def update_user(user_id: int, user_in: UserUpdate, session: SessionDep) -> User:
+def update_user(user_id: int, user_in: UserUpdate, session: SessionDep) -> UserRead:
     return user_update(user_id, user_in, session)
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
-def read_all_users(session: SessionDep) -> list[UserReadShort]:
-    return user_read_all(session)
+def read_all_users(
+    request: Request,
+    response: Response,
+    session: ReadSessionDep,
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = settings.page_size,
+    after: int | None = None,
+) -> UserPage:
+    etag = users_page_etag(session, limit, after)
+    return conditional(request, response, etag) or user_read_all(session, limit, after)
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_202_ACCEPTED)
@@ -56,12 +134,12 @@ def delete_user(user_id: int, session: SessionDep) -> str:
 
 
 @router.get("/with_items/{user_id}", status_code=status.HTTP_200_OK)
-def get_user_with_items_(user_id: int, session: SessionDep) -> UserWithItems:
+def get_user_with_items_(user_id: int, session: ReadSessionDep) -> UserWithItems:
     return user_with_items_model(user_id, session)
 
 
 @router.post("/{user_id}/cart", status_code=status.HTTP_201_CREATED)
-def create_user_cart(user_cart_in: UserCartCreate, session: SessionDep) -> UserCartRead | None:
+def create_user_cart(user_cart_in: UserCartCreate, session: SessionDep) -> CartRead:
     """
     создать корзину с товарами для пользоавателя. У пользователя может быть только 1 корзина или не быть ее.
     корзина содержит ид пользователя и список ид предметов. Создать схему корзина и обновить схему юзер
@@ -70,11 +148,12 @@ def create_user_cart(user_cart_in: UserCartCreate, session: SessionDep) -> UserC
 
 
 @router.get("/{user_id}/cart", status_code=status.HTTP_200_OK)
-def get_user_cart(user_id: int, session: SessionDep) -> UserCart:
+def get_user_cart(user_id: int, session: SessionDep, request: Request, response: Response) -> CartRead:
     """
     получить корзину с товарами для пользоавателя.
     """
-    return user_read_cart(user_id, session)
+    cart = user_read_cart(user_id, session)
+    return conditional(request, response, resource_etag(cart.id, cart.version)) or cart
 
 
 @router.delete("/{user_id}/cart", status_code=status.HTTP_202_ACCEPTED)
@@ -85,11 +164,33 @@ def delete_user_cart(user_id: int, session: SessionDep) -> dict[str, str]:
     return user_delete_cart(user_id, session)
 
 
+@router.post("/{user_id}/cart/items/{item_id}", status_code=status.HTTP_201_CREATED)
+def add_user_cart_item(
+    user_id: int, item_id: int, session: SessionDep, qty: Annotated[int, Query(ge=1)] = 1
+) -> CartLine:
+    """
+    положить товар в корзину (qty штук, к уже лежащим прибавляется). Корзины нет — она создаётся.
+    """
+    return user_cart_add_item(user_id, item_id, qty, session)
+
+
+@router.delete("/{user_id}/cart/items/{item_id}", status_code=status.HTTP_202_ACCEPTED)
+def remove_user_cart_item(user_id: int, item_id: int, session: SessionDep) -> dict[str, str]:
+    """
+    убрать товар из корзины целиком.
+    """
+    return user_cart_remove_item(user_id, item_id, session)
+
+
 @router.post("/{user_id}/items", status_code=status.HTTP_201_CREATED)
 def user_item_buy(user_id: int, item_id: int, session: SessionDep) -> dict:
+    if settings.purchase_queue_enabled:
+        return purchase_queue.execute(item_purchase(user_id, item_id))
     return user_buy_item(user_id, item_id, session)
 
 
 @router.post("/{user_id}/cart/buy", status_code=status.HTTP_202_ACCEPTED)
 def user_buy_cart_items(user_id: int, session: SessionDep) -> dict:
+    if settings.purchase_queue_enabled:
+        return purchase_queue.execute(cart_purchase(user_id))
     return user_buy_items_for_cart(user_id, session)